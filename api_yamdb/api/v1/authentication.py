@@ -0,0 +1,151 @@
+'''JWT-аутентификация без запроса пользователя к БД на каждый запрос.
+
+Для проверки прав достаточно id, username, роли и флагов пользователя.
+Их снимок хранится в ограниченном LRU в памяти процесса, а
+``request.user`` собирается из снимка как экземпляр ``User`` с
+отложенными остальными полями: обращение к ним подгрузит поле из БД.
+
+Снимок помечен меткой пользователя из общего кэша Django, которая
+проверяется на каждом запросе. Сохранение пользователя обновляет метку
+после фиксации транзакции, поэтому смену роли или блокировку сразу
+видят все процессы. Общий кэш в настройках проекта - memcached, так
+что проверка метки не обращается к БД. Срок
+``AUTH_USER_SNAPSHOT_TIMEOUT`` ограничивает жизнь снимка, если общий
+кэш потеряет запись метки.
+'''
+import threading
+import time
+from collections import OrderedDict
+from functools import partial
+
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.exceptions import (
+    AuthenticationFailed, InvalidToken,
+)
+from rest_framework_simplejwt.settings import api_settings as jwt_settings
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import router, transaction
+from django.db.models.signals import post_delete, post_save
+from django.utils.translation import gettext_lazy as _
+
+from .cache import CACHE_PREFIX
+from reviews.models import User
+
+SNAPSHOT_FIELDS = tuple(
+    field.attname for field in User._meta.concrete_fields
+    if field.attname in ('id', 'username', 'role', 'is_superuser', 'is_active')
+)
+
+
+def stamp_key(pk):
+    return f'{CACHE_PREFIX}:user:{pk}'
+
+
+def get_stamp(pk):
+    '''Метка пользователя из общего кэша; потерянная создаётся заново.'''
+    key = stamp_key(pk)
+    stamp = cache.get(key)
+    if stamp is None:
+        stamp = time.time_ns()
+        cache.add(key, stamp, timeout=None)
+    return stamp
+
+
+def bump_stamps(pks):
+    cache.set_many(
+        {stamp_key(pk): time.time_ns() for pk in pks}, timeout=None
+    )
+
+
+def invalidate_users(pks, using=None):
+    '''Сбрасывает снимки пользователей во всех процессах.
+
+    Метки обновляются после фиксации транзакции: иначе параллельный
+    запрос прочитает новую метку и ещё старую роль.
+    '''
+    transaction.on_commit(partial(bump_stamps, tuple(pks)), using=using)
+
+
+class UserSnapshotCache:
+    '''Потокобезопасный LRU снимков пользователей со сроком жизни.
+
+    Снимок возвращается, только если сохранён с той же меткой, что
+    сейчас в общем кэше. Метка читается до запроса к БД, поэтому снимок,
+    прочитанный одновременно с изменением, сохранится со старой меткой.
+    '''
+
+    def __init__(self):
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, pk, stamp):
+        with self._lock:
+            item = self._data.get(pk)
+            if item is None:
+                return None
+            expires, saved_stamp, values = item
+            if saved_stamp != stamp or expires < time.monotonic():
+                del self._data[pk]
+                return None
+            self._data.move_to_end(pk)
+            return values
+
+    def set(self, pk, stamp, values):
+        with self._lock:
+            self._data[pk] = (
+                time.monotonic() + settings.AUTH_USER_SNAPSHOT_TIMEOUT,
+                stamp,
+                values,
+            )
+            self._data.move_to_end(pk)
+            while len(self._data) > settings.AUTH_USER_SNAPSHOT_SIZE:
+                self._data.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+
+user_snapshots = UserSnapshotCache()
+
+
+class SnapshotJWTAuthentication(JWTAuthentication):
+    '''JWTAuthentication, читающая пользователя из ``user_snapshots``.'''
+
+    def get_user(self, validated_token):
+        try:
+            pk = validated_token[jwt_settings.USER_ID_CLAIM]
+        except KeyError:
+            raise InvalidToken(
+                _('Token contained no recognizable user identification')
+            )
+        stamp = get_stamp(pk)
+        values = user_snapshots.get(pk, stamp)
+        if values is None:
+            values = User.objects.filter(
+                **{jwt_settings.USER_ID_FIELD: pk}
+            ).values_list(*SNAPSHOT_FIELDS).first()
+            if values is None:
+                raise AuthenticationFailed(
+                    _('User not found'), code='user_not_found'
+                )
+            user_snapshots.set(pk, stamp, values)
+        user = User.from_db(router.db_for_read(User), SNAPSHOT_FIELDS, values)
+        if not user.is_active:
+            raise AuthenticationFailed(
+                _('User is inactive'), code='user_inactive'
+            )
+        return user
+
+
+def invalidate_user(sender, instance, using=None, **kwargs):
+    invalidate_users((instance.pk,), using)
+
+
+def connect_signals():
+    for signal in (post_save, post_delete):
+        signal.connect(
+            invalidate_user, sender=User, dispatch_uid='api:v1:user_snapshot'
+        )
@@ -0,0 +1,102 @@
+'''Версии моделей для кэша ответов и условных GET-запросов.
+
+Каждой модели соответствует метка версии в кэше Django: время последней
+записи в наносекундах. Запись в модель обновляет её метку, а ключ
+закэшированного ответа и ETag включают метки всех моделей, от которых
+зависит ответ. Поэтому изменение жанра сбрасывает ответы со списками
+жанров и произведений, но не трогает категории, а старые записи просто
+истекают по таймауту. Метка, потерянная кэшем, создаётся заново с
+текущим временем и не может совпасть с выданной ранее.
+'''
+import time
+from functools import partial
+from hashlib import md5
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models.signals import m2m_changed, post_delete, post_save
+
+from reviews.models import Category, Comment, Genre, Review, Title, User
+
+CACHE_PREFIX = 'api:v1'
+
+CACHED_MODELS = (
+    Category, Genre, Title, Title.genre.through, Review, Comment, User,
+)
+
+
+def version_key(model):
+    return f'{CACHE_PREFIX}:version:{model._meta.label_lower}'
+
+
+def get_versions(models):
+    keys = [version_key(model) for model in models]
+    versions = cache.get_many(keys)
+    missing = {key: time.time_ns() for key in keys if key not in versions}
+    if missing:
+        cache.set_many(missing, timeout=None)
+        versions.update(missing)
+    return tuple(versions[key] for key in keys)
+
+
+def bump_version(model):
+    cache.set(version_key(model), time.time_ns(), timeout=None)
+
+
+def last_modified(versions):
+    '''Время последнего изменения в секундах по меткам версий.'''
+    return max(versions, default=0) // 10 ** 9
+
+
+def fingerprint(request, versions, *extra):
+    '''Хэш запроса: путь, нормализованные параметры и версии моделей.
+
+    Пустые параметры остаются в ключе: само наличие ``?cursor=``
+    переключает пагинацию.
+    '''
+    params = sorted(
+        (name, value)
+        for name, values in request.query_params.lists()
+        for value in values
+    )
+    raw = repr((request.get_host(), request.path, params, versions, extra))
+    return md5(raw.encode()).hexdigest()
+
+
+def response_key(request, versions):
+    return f'{CACHE_PREFIX}:response:{fingerprint(request, versions)}'
+
+
+def get_timeout():
+    return getattr(settings, 'CATALOG_CACHE_TIMEOUT', 300)
+
+
+def bump_version_on_commit(model, using=None):
+    '''Обновляет метку после фиксации транзакции записи.
+
+    Иначе параллельный читатель получит новую метку, прочитает ещё
+    старые строки и закэширует их под новым ключом и ETag.
+    '''
+    transaction.on_commit(partial(bump_version, model), using=using)
+
+
+def invalidate_model(sender, using=None, **kwargs):
+    bump_version_on_commit(sender, using)
+
+
+def invalidate_relation(sender, action, using=None, **kwargs):
+    if action in ('post_add', 'post_remove', 'post_clear'):
+        bump_version_on_commit(sender, using)
+
+
+def connect_signals():
+    for model in CACHED_MODELS:
+        uid = f'{CACHE_PREFIX}:{model._meta.label_lower}'
+        post_save.connect(invalidate_model, sender=model, dispatch_uid=uid)
+        post_delete.connect(invalidate_model, sender=model, dispatch_uid=uid)
+    m2m_changed.connect(
+        invalidate_relation,
+        sender=Title.genre.through,
+        dispatch_uid=f'{CACHE_PREFIX}:title_genre',
+    )
@@ -1,6 +1,16 @@
 import django_filters
+from rest_framework.filters import OrderingFilter, SearchFilter
 
+from .genre_index import MATCH_ALL, MATCH_ANY, genre_index
 from reviews.models import Title
+from reviews.search import search_users
+
+# Верхняя граница диапазона строк, начинающихся с заданного префикса.
+MAX_CHAR = chr(0x10FFFF)
+
+# Больше id из индекса жанров не передаём параметрами pk__in, а
+# фильтруем подзапросом к таблице связей.
+GENRE_INDEX_MAX_IDS = 500
 
 
 class TitlesFilter(django_filters.FilterSet):
@@ -12,9 +22,84 @@ class TitlesFilter(django_filters.FilterSet):
         field_name='category',
         lookup_expr='slug'
     )
-    genre = django_filters.CharFilter(field_name='genre', lookup_expr='slug')
+    genre = django_filters.CharFilter(method='filter_genre')
+    genre_match = django_filters.ChoiceFilter(
+        choices=((MATCH_ANY, MATCH_ANY), (MATCH_ALL, MATCH_ALL)),
+        empty_label=None,
+        method='filter_nothing',
+    )
     year = django_filters.NumberFilter(field_name='year')
+    search = django_filters.CharFilter(method='filter_search')
 
     class Meta:
         model = Title
-        fields = ('genre', 'category', 'year', 'name',)
+        fields = ('genre', 'genre_match', 'category', 'year', 'name',
+                  'search',)
+
+    def filter_genre(self, queryset, name, value):
+        slugs = [slug.strip() for slug in value.split(',') if slug.strip()]
+        if not slugs:
+            return queryset
+        match = self.form.cleaned_data.get('genre_match') or MATCH_ANY
+        ids = genre_index.title_ids(slugs, match)
+        if not ids:
+            return queryset.none()
+        if len(ids) <= GENRE_INDEX_MAX_IDS:
+            return queryset.filter(pk__in=sorted(ids))
+        links = Title.genre.through.objects.values('title_id')
+        if match == MATCH_ALL:
+            for slug in set(slugs):
+                queryset = queryset.filter(
+                    pk__in=links.filter(genre__slug=slug)
+                )
+            return queryset
+        return queryset.filter(pk__in=links.filter(genre__slug__in=slugs))
+
+    def filter_nothing(self, queryset, name, value):
+        return queryset
+
+    def filter_search(self, queryset, name, value):
+        return queryset.search(value)
+
+
+class StableOrderingFilter(OrderingFilter):
+    '''OrderingFilter, дополняющий ``?ordering=`` полями ``ordering_tiebreak``.
+
+    Без уникального хвоста сортировки строки с равными значениями
+    (например, отзывы без комментариев) могут повторяться или
+    пропадать между страницами.
+    '''
+
+    def get_ordering(self, request, queryset, view):
+        ordering = super().get_ordering(request, queryset, view)
+        if not ordering:
+            return ordering
+        used = {name.lstrip('-') for name in ordering}
+        return [*ordering, *(
+            name for name in getattr(view, 'ordering_tiebreak', ())
+            if name.lstrip('-') not in used
+        )]
+
+
+class UserSearchFilter(SearchFilter):
+    '''Поиск пользователей по ``?search=``.
+
+    Термин с ``^`` (``?search=^adm``) ищется по началу username условием
+    ``username >= 'adm' AND username < 'adm\U0010ffff'``: его обслуживает
+    индекс username, в отличие от LIKE. Такой поиск учитывает регистр.
+    Остальные термины ищутся как подстрока username или email по
+    триграммному индексу без учёта регистра.
+    '''
+
+    prefix = '^'
+
+    def filter_queryset(self, request, queryset, view):
+        for term in self.get_search_terms(request):
+            if term.startswith(self.prefix) and len(term) > 1:
+                prefix = term[len(self.prefix):]
+                queryset = queryset.filter(
+                    username__gte=prefix, username__lt=prefix + MAX_CHAR
+                )
+            else:
+                queryset = search_users(queryset, term)
+        return queryset
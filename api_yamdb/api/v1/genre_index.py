@@ -0,0 +1,59 @@
+'''Инвертированный индекс «жанр → произведения» в памяти процесса.
+
+Индекс хранит для каждого slug жанра множество id произведений и
+позволяет пересекать и объединять их без JOIN по таблице связей.
+Актуальность проверяется по меткам версий моделей из ``cache``:
+как только жанры какого-либо произведения меняются в любом процессе,
+индекс перестраивается одним запросом при следующем обращении.
+Изменения самих произведений индекс не трогают: id удалённого
+произведения, оставшийся в индексе, просто не найдётся в ``pk__in``.
+'''
+from threading import Lock
+
+from .cache import get_versions
+from reviews.models import Genre, Title
+
+MATCH_ALL = 'all'
+MATCH_ANY = 'any'
+
+
+class GenreIndex:
+
+    dependencies = (Genre, Title.genre.through)
+
+    def __init__(self):
+        self._lock = Lock()
+        self._state = (None, {})
+
+    def get_postings(self):
+        versions = get_versions(self.dependencies)
+        state_versions, postings = self._state
+        if state_versions == versions:
+            return postings
+        with self._lock:
+            if self._state[0] != versions:
+                self._state = (versions, self.build())
+            return self._state[1]
+
+    @staticmethod
+    def build():
+        postings = {}
+        rows = Title.genre.through.objects.order_by().values_list(
+            'genre__slug', 'title_id'
+        )
+        for slug, title_id in rows.iterator():
+            postings.setdefault(slug, set()).add(title_id)
+        return {slug: frozenset(ids) for slug, ids in postings.items()}
+
+    def title_ids(self, slugs, match=MATCH_ANY):
+        postings = self.get_postings()
+        sets = [postings.get(slug, frozenset()) for slug in set(slugs)]
+        if not sets:
+            return frozenset()
+        if match == MATCH_ALL:
+            sets.sort(key=len)
+            return sets[0].intersection(*sets[1:])
+        return frozenset().union(*sets)
+
+
+genre_index = GenreIndex()
@@ -1,11 +1,159 @@
 from drf_yasg.utils import swagger_auto_schema
+from rest_framework import status
 from rest_framework.exceptions import MethodNotAllowed
 from rest_framework.mixins import (
     CreateModelMixin, DestroyModelMixin, ListModelMixin, RetrieveModelMixin,
     UpdateModelMixin,
 )
+from rest_framework.response import Response
 from rest_framework.viewsets import GenericViewSet
 
+from django.core.cache import cache
+from django.utils.http import http_date, parse_etags, quote_etag
+
+from .cache import (
+    fingerprint, get_timeout, get_versions, last_modified, response_key,
+)
+from .serializers import sparse_fieldset
+
+
+class VersionedReadMixin:
+    '''Условные GET-запросы и кэш ответов по версиям моделей.
+
+    ``version_dependencies`` перечисляет модели, от которых зависит ответ.
+    ETag и Last-Modified вычисляются по их меткам версий до обращения к
+    БД, поэтому на совпавший ``If-None-Match`` вьюсет отвечает 304 без
+    запроса и сериализации; ``If-Modified-Since`` не учитывается. При
+    ``cache_anonymous`` ответы анонимным пользователям дополнительно
+    кэшируются.
+    '''
+
+    version_dependencies = ()
+    cache_anonymous = False
+
+    def list(self, request, *args, **kwargs):
+        return self.versioned_response(
+            super().list, request, *args, **kwargs
+        )
+
+    def versioned_response(self, handler, request, *args, **kwargs):
+        versions = get_versions(self.version_dependencies)
+        headers = {
+            'ETag': quote_etag(fingerprint(
+                request, versions, request.accepted_renderer.format
+            )),
+            'Last-Modified': http_date(last_modified(versions)),
+        }
+        if self.is_not_modified(request, headers):
+            return Response(
+                status=status.HTTP_304_NOT_MODIFIED, headers=headers
+            )
+
+        cache_key = None
+        if self.cache_anonymous and not request.user.is_authenticated:
+            cache_key = response_key(request, versions)
+            data = cache.get(cache_key)
+            if data is not None:
+                return Response(data, headers=headers)
+
+        response = handler(request, *args, **kwargs)
+        if response.status_code == status.HTTP_200_OK:
+            for name, value in headers.items():
+                response[name] = value
+            if cache_key is not None:
+                cache.set(cache_key, response.data, get_timeout())
+        return response
+
+    @staticmethod
+    def is_not_modified(request, headers):
+        '''Сверяет только ETag.
+
+        ``If-Modified-Since`` игнорируется: у Last-Modified точность в
+        секунду, и запись в ту же секунду, что и прошлый ответ клиенту,
+        не отличить от отсутствия изменений. ``*`` тоже не учитывается:
+        он совпадает, только если ресурс существует, а это до запроса к
+        БД неизвестно.
+        '''
+        if_none_match = request.META.get('HTTP_IF_NONE_MATCH')
+        if not if_none_match:
+            return False
+        return headers['ETag'] in parse_etags(if_none_match)
+
+
+class VersionedDetailMixin(VersionedReadMixin):
+
+    def retrieve(self, request, *args, **kwargs):
+        return self.versioned_response(
+            super().retrieve, request, *args, **kwargs
+        )
+
+
+class CursorPaginationMixin:
+    '''Переключает вьюсет на курсорную пагинацию по параметру ``cursor``.
+
+    Без курсора в запросе используется обычная постраничная пагинация,
+    чтобы не ломать существующих клиентов; ``?cursor=`` открывает
+    первую страницу в курсорном режиме.
+    '''
+
+    cursor_pagination_class = None
+
+    @property
+    def paginator(self):
+        if (
+            not hasattr(self, '_paginator')
+            and self.cursor_pagination_class is not None
+            and self.cursor_pagination_class.cursor_query_param
+            in self.request.query_params
+        ):
+            self._paginator = self.cursor_pagination_class()
+        return super().paginator
+
+
+class SparseFieldsetMixin:
+    '''Подгоняет queryset под поля, запрошенные через ``?fields=``/``?omit=``.
+
+    Связи из ``sparse_select_related`` и ``sparse_prefetch_related``
+    загружаются, только если соответствующее поле попадёт в ответ, а
+    столбцы модели ограничиваются через ``only()``. Поля из
+    ``sparse_required_fields`` загружаются всегда, например для курсора.
+    '''
+
+    sparse_actions = ('list', 'retrieve')
+    sparse_select_related = ()
+    sparse_prefetch_related = ()
+    sparse_required_fields = ('id',)
+
+    def get_sparse_fields(self):
+        if self.action not in self.sparse_actions:
+            return None
+        serializer = self.get_serializer_class()(context={})
+        return sparse_fieldset(self.request, serializer.fields)
+
+    def filter_queryset(self, queryset):
+        queryset = super().filter_queryset(queryset)
+        names = self.get_sparse_fields()
+        select_related = [
+            name for name in self.sparse_select_related
+            if names is None or name in names
+        ]
+        if select_related:
+            queryset = queryset.select_related(*select_related)
+        prefetch_related = [
+            name for name in self.sparse_prefetch_related
+            if names is None or name in names
+        ]
+        if prefetch_related:
+            queryset = queryset.prefetch_related(*prefetch_related)
+        if names is not None:
+            columns = {
+                field.name for field in queryset.model._meta.concrete_fields
+            }
+            queryset = queryset.only(*(
+                columns & (names | set(self.sparse_required_fields))
+            ))
+        return queryset
+
 
 class PatchModelMixin(UpdateModelMixin):
 
@@ -0,0 +1,157 @@
+import json
+from base64 import b64decode, b64encode
+
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import CursorPagination
+from rest_framework.utils.urls import remove_query_param, replace_query_param
+
+from django.core.exceptions import ValidationError
+from django.db.models import Q
+
+
+class KeysetPagination(CursorPagination):
+    '''Курсорная пагинация по составному ключу сортировки.
+
+    В отличие от CursorPagination из DRF курсор хранит значения всех полей
+    ``ordering``, поэтому следующая страница выбирается условием
+    ``WHERE (поля) > (курсор)`` по индексу, без OFFSET и без COUNT(*).
+    Последнее поле сортировки должно быть уникальным.
+    '''
+
+    ordering = ('-pk',)
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.page_size = self.get_page_size(request)
+        if not self.page_size:
+            return None
+
+        self.base_url = request.build_absolute_uri()
+        self.ordering = self.get_ordering(request, queryset, view)
+        self.fields = [
+            queryset.model._meta.get_field(name.lstrip('-'))
+            for name in self.ordering
+        ]
+        position, self.reverse = self.decode_cursor(request)
+        self.has_cursor = position is not None
+
+        ordering = self.ordering
+        if self.reverse:
+            ordering = [self.invert(name) for name in ordering]
+        queryset = queryset.order_by(*ordering)
+        if position is not None:
+            queryset = queryset.filter(self.seek(ordering, position))
+
+        results = list(queryset[:self.page_size + 1])
+        self.has_more = len(results) > self.page_size
+        self.page = results[:self.page_size]
+        if self.reverse:
+            self.page.reverse()
+            self.has_next = self.has_cursor
+            self.has_previous = self.has_more
+        else:
+            self.has_next = self.has_more
+            self.has_previous = self.has_cursor
+        if (self.has_previous or self.has_next) and self.template is not None:
+            self.display_page_controls = True
+        return self.page
+
+    def get_ordering(self, request, queryset, view):
+        '''Сортировка из ``?ordering=`` вьюсета, иначе ``self.ordering``.
+
+        Курсор строится по тем же полям, что и запрошенная сортировка,
+        поэтому её последнее поле тоже должно быть уникальным.
+        '''
+        for backend in getattr(view, 'filter_backends', ()):
+            if hasattr(backend, 'get_ordering'):
+                ordering = backend().get_ordering(request, queryset, view)
+                if ordering:
+                    return tuple(ordering)
+        return self.ordering
+
+    @staticmethod
+    def invert(name):
+        return name[1:] if name.startswith('-') else f'-{name}'
+
+    def seek(self, ordering, position):
+        '''Условие «строка идёт после курсора» для заданной сортировки.'''
+        condition = Q()
+        equal = Q()
+        for name, value in zip(ordering, position):
+            field = name.lstrip('-')
+            lookup = 'lt' if name.startswith('-') else 'gt'
+            condition |= equal & Q(**{f'{field}__{lookup}': value})
+            equal &= Q(**{field: value})
+        return condition
+
+    def get_next_link(self):
+        if not self.has_next:
+            return None
+        if not self.page:
+            return remove_query_param(self.base_url, self.cursor_query_param)
+        return self.encode_cursor(self.page[-1], reverse=False)
+
+    def get_previous_link(self):
+        if not self.has_previous:
+            return None
+        if not self.page:
+            return remove_query_param(self.base_url, self.cursor_query_param)
+        return self.encode_cursor(self.page[0], reverse=True)
+
+    def decode_cursor(self, request):
+        encoded = request.query_params.get(self.cursor_query_param)
+        if not encoded:
+            return None, False
+        try:
+            data = json.loads(b64decode(encoded.encode('ascii')))
+            if len(data['p']) != len(self.fields):
+                raise ValueError
+            position = [
+                field.to_python(value)
+                for field, value in zip(self.fields, data['p'])
+            ]
+            return position, bool(data.get('r'))
+        except (TypeError, ValueError, KeyError, ValidationError):
+            raise NotFound(self.invalid_cursor_message)
+
+    def encode_cursor(self, instance, reverse):
+        data = {
+            'p': [field.value_to_string(instance) for field in self.fields],
+        }
+        if reverse:
+            data['r'] = 1
+        encoded = b64encode(
+            json.dumps(data, separators=(',', ':')).encode('ascii')
+        ).decode('ascii')
+        return replace_query_param(
+            self.base_url, self.cursor_query_param, encoded
+        )
+
+
+class TitleCursorPagination(KeysetPagination):
+    '''Курсор по индексу ``year``: в SQLite он уже содержит ``id``.'''
+
+    ordering = ('-year', 'id')
+
+
+class ReviewCursorPagination(KeysetPagination):
+    '''Курсор по индексу ``(title_id, pub_date)``.'''
+
+    ordering = ('-pub_date', '-id')
+
+
+class CommentCursorPagination(KeysetPagination):
+    '''Курсор по индексу ``(review_id, pub_date)``.'''
+
+    ordering = ('-pub_date', '-id')
+
+
+class AuthorReviewCursorPagination(KeysetPagination):
+    '''Курсор по индексу ``(author_id, pub_date)`` отзывов.'''
+
+    ordering = ('-pub_date', '-id')
+
+
+class AuthorCommentCursorPagination(KeysetPagination):
+    '''Курсор по индексу ``(author_id, pub_date)`` комментариев.'''
+
+    ordering = ('-pub_date', '-id')
@@ -1,11 +1,52 @@
-from rest_framework import serializers
-from rest_framework.generics import get_object_or_404
+from collections import defaultdict
+
+from rest_framework import permissions, serializers
+from rest_framework.settings import api_settings
 from rest_framework.validators import UniqueValidator
 
-from reviews.models import Category, Comment, Genre, Review, Title, User
+from django.conf import settings
+from django.db import IntegrityError, transaction
+
+from .authentication import invalidate_users
+from .cache import bump_version_on_commit
+from reviews.models import (
+    SCORE_COUNT_FIELDS, Category, Comment, Genre, Review, Title, User,
+)
+from reviews.search import index_titles
 from reviews.validators import UsernameRegexValidator
 
 
+def sparse_fieldset(request, available):
+    '''Поля ответа по параметрам ``?fields=`` и ``?omit=``.
+
+    Возвращает None, если клиент не ограничивал набор полей.
+    '''
+    fields = request.query_params.get('fields')
+    omit = request.query_params.get('omit')
+    if not fields and not omit:
+        return None
+    names = set(available)
+    if fields:
+        names &= {name.strip() for name in fields.split(',')}
+    if omit:
+        names -= {name.strip() for name in omit.split(',')}
+    return names
+
+
+class SparseFieldsetSerializerMixin:
+    '''Убирает из ответа на чтение поля, не запрошенные клиентом.'''
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        request = self.context.get('request')
+        if request is None or request.method not in permissions.SAFE_METHODS:
+            return
+        names = sparse_fieldset(request, self.fields)
+        if names is not None:
+            for name in set(self.fields) - names:
+                self.fields.pop(name)
+
+
 class CategorySerializer(serializers.ModelSerializer):
     '''Сериализатор категории.'''
 
@@ -24,21 +65,26 @@ class GenreSerializer(serializers.ModelSerializer):
         lookup_field = 'slug'
 
 
-class TitleShowSerializer(serializers.ModelSerializer):
+class TitleShowSerializer(
+    SparseFieldsetSerializerMixin, serializers.ModelSerializer
+):
     '''Сериализатор для просмотра произведений.'''
 
     category = CategorySerializer(read_only=True)
     genre = GenreSerializer(read_only=True, many=True)
-    rating = serializers.IntegerField(
-        read_only=True,
-        source='reviews__score__avg'
-    )
 
     class Meta:
-        fields = '__all__'
+        exclude = ('rating_sum', *SCORE_COUNT_FIELDS)
         model = Title
 
 
+class TitleTopSerializer(TitleShowSerializer):
+    '''Сериализатор произведения из топа по взвешенному рейтингу.'''
+
+    position = serializers.IntegerField(source='rank.position')
+    weighted_rating = serializers.FloatField(source='rank.weighted_rating')
+
+
 class TitleCreateSerializer(serializers.ModelSerializer):
     '''Сериализатор для создания произведений.'''
 
@@ -48,11 +94,136 @@ class TitleCreateSerializer(serializers.ModelSerializer):
         queryset=Genre.objects.all(), slug_field='slug', many=True)
 
     class Meta:
-        fields = '__all__'
+        exclude = ('rating_sum', *SCORE_COUNT_FIELDS)
+        model = Title
+
+
+class RatingDistributionSerializer(serializers.ModelSerializer):
+    '''Распределение оценок произведения по счётчикам гистограммы.'''
+
+    distribution = serializers.DictField(
+        source='rating_distribution', child=serializers.IntegerField()
+    )
+
+    class Meta:
+        fields = ('id', 'rating', 'review_count', 'distribution')
+        model = Title
+
+
+class BulkListSerializer(serializers.ListSerializer):
+    '''Основа для массового создания объектов одним bulk_create.'''
+
+    def to_internal_value(self, data):
+        if isinstance(data, list) and (
+            len(data) > settings.BULK_CREATE_MAX_ITEMS
+        ):
+            raise serializers.ValidationError({
+                'non_field_errors': [
+                    'Допускается не более '
+                    f'{settings.BULK_CREATE_MAX_ITEMS} объектов за запрос.'
+                ]
+            })
+        return super().to_internal_value(data)
+
+    @staticmethod
+    def bulk_insert(model, objs):
+        '''Вставляет объекты и проставляет им id; вызывать в транзакции.'''
+        model.objects.bulk_create(objs)
+        if objs and objs[0].pk is None:
+            # SQLite в Django 3.2 не возвращает id из bulk_create.
+            # Внутри транзакции запись в БД заблокирована для других
+            # соединений, поэтому последние id принадлежат этому пакету.
+            ids = model.objects.order_by('-pk').values_list(
+                'pk', flat=True
+            )[:len(objs)]
+            for obj, pk in zip(objs, reversed(ids)):
+                obj.pk = pk
+        return objs
+
+
+class TitleBulkListSerializer(BulkListSerializer):
+    '''Массовое создание произведений одной транзакцией.
+
+    Slug категорий и жанров всех элементов разрешаются одним запросом на
+    модель, произведения и их связи с жанрами вставляются через
+    bulk_create. Ошибки возвращаются списком по элементам пакета.
+    '''
+
+    def to_internal_value(self, data):
+        attrs = super().to_internal_value(data)
+        categories = Category.objects.in_bulk(
+            {item['category'] for item in attrs}, field_name='slug'
+        )
+        genres = Genre.objects.in_bulk(
+            {slug for item in attrs for slug in item['genre']},
+            field_name='slug',
+        )
+        errors = []
+        for item in attrs:
+            item_errors = {}
+            if item['category'] not in categories:
+                item_errors['category'] = [
+                    f'Категория {item["category"]} не найдена.'
+                ]
+            missing = [slug for slug in item['genre'] if slug not in genres]
+            if missing:
+                item_errors['genre'] = [
+                    f'Жанр {slug} не найден.' for slug in missing
+                ]
+            errors.append(item_errors)
+            item['category'] = categories.get(item['category'])
+            item['genre'] = [genres.get(slug) for slug in item['genre']]
+        if any(errors):
+            raise serializers.ValidationError(errors)
+        return attrs
+
+    def create(self, validated_data):
+        titles = [
+            Title(**{
+                key: value for key, value in item.items() if key != 'genre'
+            })
+            for item in validated_data
+        ]
+        with transaction.atomic():
+            self.bulk_insert(Title, titles)
+            Title.genre.through.objects.bulk_create(
+                Title.genre.through(title_id=title.pk, genre_id=genre.pk)
+                for title, item in zip(titles, validated_data)
+                for genre in dict.fromkeys(item['genre'])
+            )
+            index_titles(titles)
+        for title, item in zip(titles, validated_data):
+            title.bulk_genres = item['genre']
+        bump_version_on_commit(Title)
+        bump_version_on_commit(Title.genre.through)
+        return titles
+
+
+class TitleBulkCreateSerializer(serializers.ModelSerializer):
+    '''Элемент пакета для массового создания произведений.'''
+
+    category = serializers.SlugField()
+    genre = serializers.ListField(child=serializers.SlugField())
+
+    class Meta:
+        fields = ('id', 'name', 'year', 'description', 'category', 'genre')
         model = Title
+        list_serializer_class = TitleBulkListSerializer
+
+    def to_representation(self, instance):
+        return {
+            'id': instance.pk,
+            'name': instance.name,
+            'year': instance.year,
+            'description': instance.description,
+            'category': instance.category.slug,
+            'genre': [genre.slug for genre in instance.bulk_genres],
+        }
 
 
-class ReviewSerializer(serializers.ModelSerializer):
+class ReviewSerializer(
+    SparseFieldsetSerializerMixin, serializers.ModelSerializer
+):
     '''Сериализатор для отзывов.'''
     author = serializers.SlugRelatedField(
         slug_field='username',
@@ -74,20 +245,140 @@ class ReviewSerializer(serializers.ModelSerializer):
         fields = '__all__'
         model = Review
 
-    def validate(self, data):
-        request = self.context.get('request')
-        view = self.context.get('view')
-        author = request.user
-        title = get_object_or_404(Title, id=view.kwargs.get('title_id'))
-
-        if (title.reviews.filter(author=author).exists()
-           and request.method == 'POST'):
-            raise serializers.ValidationError(
-                'Вы уже отправляли отзыв на это произведение. '
-                'Возможно составить только один отзыв.'
-            )
+    def to_representation(self, instance):
+        '''Добавляет комментарии, подгруженные вьюсетом по ``?include=``.'''
+        data = super().to_representation(instance)
+        if hasattr(instance, 'included_comments'):
+            data['comments'] = CommentSerializer(
+                instance.included_comments, many=True, context=self.context
+            ).data
         return data
 
+    def create(self, validated_data):
+        '''Создаёт отзыв, полагаясь на ограничение unique_review.
+
+        В режиме ``upsert`` из контекста повторный отзыв автора
+        заменяет существующий, а ``self.created`` становится False.
+        '''
+        self.created = True
+        try:
+            return super().create(validated_data)
+        except IntegrityError:
+            review = Review.objects.filter(
+                author=validated_data['author'], title=validated_data['title']
+            ).first()
+        if review is None:
+            # Нарушено другое ограничение, или найденный отзыв уже удалён.
+            raise serializers.ValidationError({
+                api_settings.NON_FIELD_ERRORS_KEY: [
+                    'Не удалось сохранить отзыв. Повторите запрос.'
+                ]
+            })
+        if not self.context.get('upsert'):
+            raise serializers.ValidationError({
+                api_settings.NON_FIELD_ERRORS_KEY: [
+                    'Вы уже отправляли отзыв на это произведение. '
+                    'Возможно составить только один отзыв.'
+                ]
+            })
+        self.created = False
+        return self.update(review, validated_data)
+
+
+class ReviewBulkListSerializer(BulkListSerializer):
+    '''Массовая загрузка отзывов от партнёров одной транзакцией.
+
+    Авторы и произведения всех элементов разрешаются одним запросом на
+    модель, уже существующие пары (автор, произведение) ищутся одним
+    запросом, повторы внутри пакета - по множеству пар. Рейтинг каждого
+    затронутого произведения сдвигается одним UPDATE на весь пакет.
+    '''
+
+    def to_internal_value(self, data):
+        attrs = super().to_internal_value(data)
+        authors = User.objects.in_bulk(
+            {item['author'] for item in attrs}, field_name='username'
+        )
+        titles = Title.objects.only('pk').in_bulk(
+            {item['title'] for item in attrs}
+        )
+        existing = set(Review.objects.filter(
+            author__in=authors.values(), title__in=titles.values()
+        ).values_list('author__username', 'title_id'))
+        seen = set()
+        errors = []
+        for item in attrs:
+            item_errors = {}
+            if item['author'] not in authors:
+                item_errors['author'] = [
+                    f'Пользователь {item["author"]} не найден.'
+                ]
+            if item['title'] not in titles:
+                item_errors['title'] = [
+                    f'Произведение {item["title"]} не найдено.'
+                ]
+            pair = (item['author'], item['title'])
+            if pair in existing or pair in seen:
+                item_errors[api_settings.NON_FIELD_ERRORS_KEY] = [
+                    f'Отзыв {item["author"]} на произведение '
+                    f'{item["title"]} уже существует.'
+                ]
+            seen.add(pair)
+            errors.append(item_errors)
+            item['author'] = authors.get(item['author'])
+            item['title'] = titles.get(item['title'])
+        if any(errors):
+            raise serializers.ValidationError(errors)
+        return attrs
+
+    def create(self, validated_data):
+        reviews = [Review(**item) for item in validated_data]
+        scores = defaultdict(list)
+        for review in reviews:
+            scores[review.title_id].append(review.score)
+        try:
+            with transaction.atomic():
+                self.bulk_insert(Review, reviews)
+                for title_id, added in scores.items():
+                    Title.objects.filter(pk=title_id).shift_rating(
+                        added=added
+                    )
+        except IntegrityError:
+            raise serializers.ValidationError({
+                api_settings.NON_FIELD_ERRORS_KEY: [
+                    'Часть отзывов пакета уже была добавлена. '
+                    'Повторите запрос.'
+                ]
+            })
+        bump_version_on_commit(Review)
+        bump_version_on_commit(Title)
+        return reviews
+
+
+class ReviewBulkCreateSerializer(serializers.ModelSerializer):
+    '''Элемент пакета для массовой загрузки отзывов.'''
+
+    author = serializers.CharField()
+    title = serializers.IntegerField()
+    score = serializers.IntegerField(min_value=1, max_value=10)
+
+    class Meta:
+        fields = ('id', 'author', 'title', 'text', 'score', 'pub_date')
+        model = Review
+        list_serializer_class = ReviewBulkListSerializer
+
+    def to_representation(self, instance):
+        return {
+            'id': instance.pk,
+            'author': instance.author.username,
+            'title': instance.title_id,
+            'text': instance.text,
+            'score': instance.score,
+            'pub_date': serializers.DateTimeField().to_representation(
+                instance.pub_date
+            ),
+        }
+
 
 class CommentSerializer(serializers.ModelSerializer):
     '''Сериализатор для комментариев.'''
@@ -132,6 +423,47 @@ class UserEditSerializer(serializers.ModelSerializer):
         read_only_fields = ('role',)
 
 
+class UserBulkUpdateSerializer(serializers.ModelSerializer):
+    '''Изменение роли и полей профиля сразу у нескольких пользователей.
+
+    Все найденные пользователи обновляются одним UPDATE ... WHERE
+    username IN (...), после чего сбрасываются их снимки аутентификации.
+    '''
+    usernames = serializers.ListField(
+        child=serializers.CharField(max_length=150),
+        allow_empty=False,
+        max_length=settings.BULK_CREATE_MAX_ITEMS,
+    )
+
+    class Meta:
+        fields = ('usernames', 'role', 'first_name', 'last_name', 'bio')
+        model = User
+
+    def validate(self, attrs):
+        if len(attrs) == 1:
+            raise serializers.ValidationError(
+                'Укажите хотя бы одно поле для изменения.'
+            )
+        return attrs
+
+    def create(self, validated_data):
+        usernames = list(dict.fromkeys(validated_data.pop('usernames')))
+        with transaction.atomic():
+            found = dict(User.objects.filter(
+                username__in=usernames
+            ).values_list('username', 'pk'))
+            User.objects.filter(username__in=found).update(**validated_data)
+        invalidate_users(found.values())
+        bump_version_on_commit(User)
+        return [
+            {
+                'username': username,
+                'status': 'updated' if username in found else 'not_found',
+            }
+            for username in usernames
+        ]
+
+
 class RegisterDataSerializer(serializers.ModelSerializer):
     username = serializers.CharField(
         max_length=150,
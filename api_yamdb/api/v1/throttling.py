@@ -0,0 +1,177 @@
+import time
+from collections.abc import Mapping
+from hashlib import md5
+
+from rest_framework.throttling import SimpleRateThrottle
+
+
+class TokenBucketThrottle(SimpleRateThrottle):
+    '''Троттлинг «ведро с токенами» в кэше Django.
+
+    Ставка ``N/период`` из ``DEFAULT_THROTTLE_RATES`` задаёт ёмкость
+    ведра N и скорость пополнения N токенов за период, поэтому после
+    паузы допускается короткий всплеск, но не больше N запросов подряд.
+    Запрос расходует по токену из каждого своего ведра; если хотя бы
+    одно пусто, токены не списываются и DRF вернёт 429 с заголовком
+    ``Retry-After``.
+    '''
+
+    wait_seconds = None
+    lock_timeout = 2
+    lock_attempts = 5
+    lock_delay = 0.01
+
+    def get_cache_keys(self, request, view):
+        raise NotImplementedError('.get_cache_keys() must be overridden')
+
+    def get_buckets(self, request, view):
+        '''Вёдра запроса: тройки (ключ, ёмкость, период в секундах).'''
+        if self.rate is None:
+            return []
+        return [
+            (key, self.num_requests, self.duration)
+            for key in self.get_cache_keys(request, view)
+        ]
+
+    def allow_request(self, request, view):
+        buckets = self.get_buckets(request, view)
+        if not buckets:
+            return True
+        locks = self.lock_buckets(sorted({key for key, _, _ in buckets}))
+        if locks is None:
+            # Ведро сейчас меняет параллельный запрос того же клиента.
+            self.wait_seconds = self.lock_timeout
+            return False
+        try:
+            return self.take_tokens(buckets)
+        finally:
+            self.cache.delete_many(locks)
+
+    def lock_buckets(self, keys):
+        '''Блокирует вёдра через атомарный ``cache.add``.
+
+        Без блокировки параллельные запросы прочитали бы один и тот же
+        остаток токенов и прошли бы все. Возвращает ключи взятых
+        блокировок или None, если ведро занято другим запросом.
+        Недоступный кэш не хранит ни блокировки, ни вёдра, поэтому
+        тогда запрос пропускается без блокировки. Остаётся гонка, если
+        запрос держит блокировку дольше ``lock_timeout``: её истечение
+        впустит второй запрос к тому же ведру.
+        '''
+        locks = []
+        for key in keys:
+            lock = f'{key}:lock'
+            if self.acquire(lock):
+                locks.append(lock)
+            elif self.cache.get(lock) is not None:
+                self.cache.delete_many(locks)
+                return None
+        return locks
+
+    def acquire(self, lock):
+        for _ in range(self.lock_attempts):
+            if self.cache.add(lock, 1, self.lock_timeout):
+                return True
+            time.sleep(self.lock_delay)
+        return False
+
+    def take_tokens(self, buckets):
+        now = self.timer()
+        saved = self.cache.get_many([key for key, _, _ in buckets])
+        levels, waits = {}, []
+        for key, capacity, duration in buckets:
+            refill = capacity / duration
+            tokens, updated = saved.get(key, (capacity, now))
+            levels[key] = min(capacity, tokens + (now - updated) * refill)
+            if levels[key] < 1:
+                waits.append((1 - levels[key]) / refill)
+        if waits:
+            self.wait_seconds = max(waits)
+            return False
+        self.cache.set_many(
+            {key: (tokens - 1, now) for key, tokens in levels.items()},
+            max(duration for _, _, duration in buckets),
+        )
+        return True
+
+    def wait(self):
+        return self.wait_seconds
+
+
+class CombinedThrottle(TokenBucketThrottle):
+    '''Проверяет вёдра нескольких троттлингов как одно целое.
+
+    DRF вызывает каждый класс из ``throttle_classes``, поэтому запрос,
+    отклонённый одним троттлингом, всё равно расходовал бы токены
+    остальных. Здесь токены списываются, только если не пусто ни одно
+    ведро, а ставки по-прежнему задаются scope входящих классов.
+    '''
+
+    throttle_classes = ()
+
+    def __init__(self):
+        self.throttles = [throttle() for throttle in self.throttle_classes]
+
+    def get_buckets(self, request, view):
+        return [
+            bucket
+            for throttle in self.throttles
+            for bucket in throttle.get_buckets(request, view)
+        ]
+
+
+class IPThrottle(TokenBucketThrottle):
+    '''Ведро на IP-адрес клиента.
+
+    Адрес берётся с учётом ``NUM_PROXIES`` из настроек DRF: заголовку
+    ``X-Forwarded-For`` доверяется только за известным числом прокси.
+    '''
+
+    def get_cache_keys(self, request, view):
+        return [self.cache_format % {
+            'scope': self.scope, 'ident': self.get_ident(request),
+        }]
+
+
+class IdentityThrottle(TokenBucketThrottle):
+    '''Ведро на каждое значение полей ``identity_fields`` из запроса.'''
+
+    identity_fields = ('username', 'email')
+
+    def get_cache_keys(self, request, view):
+        keys = []
+        if not isinstance(request.data, Mapping):
+            return keys
+        for field in self.identity_fields:
+            value = request.data.get(field)
+            if isinstance(value, str) and value.strip():
+                ident = md5(value.strip().lower().encode()).hexdigest()
+                keys.append(self.cache_format % {
+                    'scope': self.scope, 'ident': f'{field}_{ident}',
+                })
+        return keys
+
+
+class SignupIPThrottle(IPThrottle):
+    scope = 'signup_ip'
+
+
+class SignupIdentityThrottle(IdentityThrottle):
+    scope = 'signup_identity'
+
+
+class TokenIPThrottle(IPThrottle):
+    scope = 'token_ip'
+
+
+class TokenIdentityThrottle(IdentityThrottle):
+    scope = 'token_identity'
+    identity_fields = ('username',)
+
+
+class SignupThrottle(CombinedThrottle):
+    throttle_classes = (SignupIPThrottle, SignupIdentityThrottle)
+
+
+class TokenThrottle(CombinedThrottle):
+    throttle_classes = (TokenIPThrottle, TokenIdentityThrottle)
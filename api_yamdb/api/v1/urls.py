@@ -3,8 +3,8 @@ from rest_framework.routers import DefaultRouter
 from django.urls import include, path
 
 from .views import (
-    CategoryViewSet, CommentViewSet, GenreViewSet, ReviewViewSet, TitleViewSet,
-    UserViewSet, get_jwt_token, register,
+    CategoryViewSet, CommentViewSet, GenreViewSet, ReviewBulkViewSet,
+    ReviewViewSet, TitleViewSet, UserViewSet, get_jwt_token, register,
 )
 
 app_name = 'api'
@@ -19,6 +19,9 @@ v1_router.register(
     ReviewViewSet,
     basename='reviews',
 )
+v1_router.register(
+    'reviews/bulk', ReviewBulkViewSet, basename='reviews-bulk'
+)
 v1_router.register(
     r'titles/(?P<title_id>\d+)/reviews/(?P<review_id>\d+)/comments',
     CommentViewSet,
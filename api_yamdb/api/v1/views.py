@@ -1,34 +1,58 @@
+import json
+from itertools import islice
+
 from django_filters.rest_framework import DjangoFilterBackend
 from rest_framework import permissions, status, viewsets
-from rest_framework.decorators import action, api_view, permission_classes
+from rest_framework.decorators import (
+    action, api_view, permission_classes, throttle_classes,
+)
+from rest_framework.exceptions import ValidationError
 from rest_framework.filters import SearchFilter
 from rest_framework.pagination import PageNumberPagination
 from rest_framework.response import Response
+from rest_framework.utils.encoders import JSONEncoder
 from rest_framework.viewsets import ModelViewSet
 from rest_framework_simplejwt.tokens import AccessToken
 
 from django.conf import settings
 from django.contrib.auth.tokens import default_token_generator
-from django.core.mail import send_mail
-from django.db import IntegrityError
-from django.db.models import Avg
+from django.db import IntegrityError, transaction
+from django.db.models import prefetch_related_objects
+from django.http import StreamingHttpResponse
 from django.shortcuts import get_object_or_404
 
-from .filters import TitlesFilter
-from .mixins import DestroyCreateListMixin, PutDenyMixin
+from core.models import OutgoingEmail
+
+from .filters import StableOrderingFilter, TitlesFilter, UserSearchFilter
+from .mixins import (
+    CursorPaginationMixin, DestroyCreateListMixin, PutDenyMixin,
+    SparseFieldsetMixin, VersionedDetailMixin, VersionedReadMixin,
+)
+from .pagination import (
+    AuthorCommentCursorPagination, AuthorReviewCursorPagination,
+    CommentCursorPagination, ReviewCursorPagination, TitleCursorPagination,
+)
 from .permissions import IsAdmin, IsAdminOrReadOnly, IsAdminOwnerOrReadOnly
 from .serializers import (
     CategorySerializer, CommentSerializer, GenreSerializer,
-    RegisterDataSerializer, ReviewSerializer, TitleCreateSerializer,
-    TitleShowSerializer, TokenSerializer, UserEditSerializer, UserSerializer,
+    RatingDistributionSerializer, RegisterDataSerializer,
+    ReviewBulkCreateSerializer, ReviewSerializer, TitleBulkCreateSerializer,
+    TitleCreateSerializer, TitleShowSerializer, TitleTopSerializer,
+    TokenSerializer, UserBulkUpdateSerializer, UserEditSerializer,
+    UserSerializer,
+)
+from .throttling import SignupThrottle, TokenThrottle
+from reviews.models import (
+    SCORE_COUNT_FIELDS, Category, Comment, Genre, Review, Title, User,
 )
-from reviews.models import Category, Genre, Review, Title, User
 
 
-class CategoryViewSet(DestroyCreateListMixin):
+class CategoryViewSet(VersionedReadMixin, DestroyCreateListMixin):
     """Вьюсет для категории."""
 
     queryset = Category.objects.all()
+    version_dependencies = (Category,)
+    cache_anonymous = True
     serializer_class = CategorySerializer
     permission_classes = (IsAdminOrReadOnly,)
     filter_backends = (SearchFilter,)
@@ -36,10 +60,12 @@ class CategoryViewSet(DestroyCreateListMixin):
     lookup_field = 'slug'
 
 
-class GenreViewSet(DestroyCreateListMixin):
+class GenreViewSet(VersionedReadMixin, DestroyCreateListMixin):
     """Вьюсет для жанра."""
 
     queryset = Genre.objects.all()
+    version_dependencies = (Genre,)
+    cache_anonymous = True
     serializer_class = GenreSerializer
     permission_classes = (IsAdminOrReadOnly,)
     filter_backends = (SearchFilter,)
@@ -47,51 +73,221 @@ class GenreViewSet(DestroyCreateListMixin):
     lookup_field = 'slug'
 
 
-class TitleViewSet(PutDenyMixin):
+class TitleViewSet(
+    VersionedDetailMixin, SparseFieldsetMixin, CursorPaginationMixin,
+    PutDenyMixin
+):
     """Вьюсет для произведений."""
 
-    queryset = Title.objects.all().annotate(
-        Avg('reviews__score')).order_by('-year')
+    queryset = Title.objects.order_by('-year', 'id')
+    sparse_select_related = ('category',)
+    sparse_prefetch_related = ('genre',)
+    sparse_required_fields = ('id', 'year')
     permission_classes = (IsAdminOrReadOnly,)
+    cursor_pagination_class = TitleCursorPagination
+    version_dependencies = (
+        Title, Title.genre.through, Genre, Category, Review,
+    )
+    cache_anonymous = True
     filter_backends = (DjangoFilterBackend,)
     filterset_class = TitlesFilter
     http_method_names = ('get', 'post', 'delete', 'patch')
+    export_chunk_size = 1000
 
     def get_serializer_class(self):
         if self.action in ('list', 'retrieve'):
             return TitleShowSerializer
+        if self.action == 'bulk_create':
+            return TitleBulkCreateSerializer
         return TitleCreateSerializer
 
+    @action(methods=('get',), detail=False, permission_classes=(IsAdmin,))
+    def export(self, request):
+        """Выгрузка всего каталога в формате NDJSON потоком."""
+        return StreamingHttpResponse(
+            self.export_lines(), content_type='application/x-ndjson'
+        )
+
+    def export_lines(self):
+        titles = Title.objects.select_related('category').order_by('pk')
+        rows = titles.iterator(chunk_size=self.export_chunk_size)
+        context = self.get_serializer_context()
+        while True:
+            chunk = list(islice(rows, self.export_chunk_size))
+            if not chunk:
+                return
+            prefetch_related_objects(chunk, 'genre')
+            for data in TitleShowSerializer(
+                chunk, many=True, context=context
+            ).data:
+                yield json.dumps(
+                    data, cls=JSONEncoder, ensure_ascii=False
+                ) + '\n'
+
+    @action(methods=('get',), detail=False, cursor_pagination_class=None)
+    def top(self, request):
+        """Произведения по местам из таблицы, собранной rank_titles."""
+        queryset = Title.objects.filter(
+            rank__isnull=False
+        ).select_related('category', 'rank').prefetch_related(
+            'genre'
+        ).order_by('rank__position')
+        page = self.paginate_queryset(queryset)
+        serializer = TitleTopSerializer(
+            page, many=True, context=self.get_serializer_context()
+        )
+        return self.get_paginated_response(serializer.data)
+
+    @action(methods=('get',), detail=True, url_path='rating-distribution')
+    def rating_distribution(self, request, pk=None):
+        """Распределение оценок 1–10 из счётчиков произведения."""
+        return self.versioned_response(
+            self.get_rating_distribution, request, pk=pk
+        )
+
+    def get_rating_distribution(self, request, pk=None):
+        title = get_object_or_404(
+            Title.objects.only('rating', 'review_count', *SCORE_COUNT_FIELDS),
+            pk=pk,
+        )
+        return Response(RatingDistributionSerializer(title).data)
+
+    @action(methods=('post',), detail=False, url_path='bulk')
+    def bulk_create(self, request):
+        serializer = self.get_serializer(data=request.data, many=True)
+        serializer.is_valid(raise_exception=True)
+        serializer.save()
+        return Response(serializer.data, status=status.HTTP_201_CREATED)
 
-class ReviewViewSet(ModelViewSet):
+
+class ReviewViewSet(
+    VersionedDetailMixin, SparseFieldsetMixin, CursorPaginationMixin,
+    ModelViewSet
+):
     """Вьюсет для отзывов."""
     serializer_class = ReviewSerializer
     permission_classes = (IsAdminOwnerOrReadOnly,)
+    cursor_pagination_class = ReviewCursorPagination
+    sparse_select_related = ('author', 'title')
+    sparse_required_fields = ('id', 'pub_date')
+    filter_backends = (StableOrderingFilter,)
+    ordering_fields = ('pub_date', 'comment_count')
+    ordering_tiebreak = ('-pub_date', '-id')
+    version_dependencies = (Review, Comment, Title, User)
+    comments_limit = 3
+    max_comments_limit = 20
 
     def get_title(self):
-        return get_object_or_404(Title, pk=self.kwargs.get('title_id'))
+        if not hasattr(self, '_title'):
+            self._title = get_object_or_404(
+                Title, pk=self.kwargs.get('title_id')
+            )
+        return self._title
 
     def get_queryset(self):
         return self.get_title().reviews.all()
 
+    def get_comments_limit(self):
+        """Число комментариев на отзыв для ``?include=comments``."""
+        params = self.request.query_params
+        if 'comments' not in params.get('include', '').split(','):
+            return None
+        value = params.get('comments_limit')
+        if value is None:
+            return self.comments_limit
+        try:
+            limit = int(value)
+        except ValueError:
+            limit = 0
+        if not 1 <= limit <= self.max_comments_limit:
+            raise ValidationError({'comments_limit': [
+                f'Допускаются значения от 1 до {self.max_comments_limit}.'
+            ]})
+        return limit
+
+    def include_comments(self, reviews):
+        """Подгружает последние комментарии отзывов одним запросом."""
+        limit = self.get_comments_limit()
+        if limit is None or not reviews:
+            return
+        included = {review.pk: [] for review in reviews}
+        for comment in Comment.objects.latest_for_reviews(
+            included, limit
+        ).select_related('author'):
+            included[comment.review_id].append(comment)
+        for review in reviews:
+            review.included_comments = included[review.pk]
+
+    def paginate_queryset(self, queryset):
+        page = super().paginate_queryset(queryset)
+        if page is not None:
+            self.include_comments(page)
+        return page
+
+    def get_object(self):
+        review = super().get_object()
+        if self.action == 'retrieve':
+            self.include_comments((review,))
+        return review
+
+    def get_serializer_context(self):
+        context = super().get_serializer_context()
+        context['upsert'] = (
+            self.request.query_params.get('upsert') in ('1', 'true')
+        )
+        return context
+
+    def create(self, request, *args, **kwargs):
+        """Создание отзыва; с ``?upsert=true`` заменяет свой отзыв."""
+        serializer = self.get_serializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        self.perform_create(serializer)
+        return Response(
+            serializer.data,
+            status=(
+                status.HTTP_201_CREATED if serializer.created
+                else status.HTTP_200_OK
+            ),
+            headers=self.get_success_headers(serializer.data),
+        )
+
     def perform_create(self, serializer):
         serializer.save(author=self.request.user, title=self.get_title())
 
 
-class CommentViewSet(ModelViewSet):
+class ReviewBulkViewSet(viewsets.GenericViewSet):
+    """Массовая загрузка отзывов партнёров администратором."""
+
+    serializer_class = ReviewBulkCreateSerializer
+    permission_classes = (IsAdmin,)
+
+    def create(self, request):
+        serializer = self.get_serializer(data=request.data, many=True)
+        serializer.is_valid(raise_exception=True)
+        serializer.save()
+        return Response(serializer.data, status=status.HTTP_201_CREATED)
+
+
+class CommentViewSet(
+    VersionedDetailMixin, CursorPaginationMixin, ModelViewSet
+):
     """Вьюсет для комментариев на отзывы."""
     serializer_class = CommentSerializer
     permission_classes = (IsAdminOwnerOrReadOnly,)
+    cursor_pagination_class = CommentCursorPagination
+    version_dependencies = (Comment, Review, Title, User)
 
     def get_review(self):
-        return get_object_or_404(
-            Review,
-            title__id=self.kwargs.get('title_id'),
-            pk=self.kwargs.get('review_id')
-        )
+        if not hasattr(self, '_review'):
+            self._review = get_object_or_404(
+                Review,
+                title__id=self.kwargs.get('title_id'),
+                pk=self.kwargs.get('review_id')
+            )
+        return self._review
 
     def get_queryset(self):
-        return self.get_review().comments.all()
+        return self.get_review().comments.select_related('author')
 
     def perform_create(self, serializer):
         serializer.save(author=self.request.user, review=self.get_review())
@@ -99,33 +295,37 @@ class CommentViewSet(ModelViewSet):
 
 @api_view(('POST',))
 @permission_classes((permissions.AllowAny,))
+@throttle_classes((SignupThrottle,))
 def register(request):
     serializer = RegisterDataSerializer(data=request.data)
     serializer.is_valid(raise_exception=True)
     username = serializer.validated_data['username']
     email = serializer.validated_data['email']
     try:
-        user, _ = User.objects.get_or_create(
-            username=username,
-            email=email,
-        )
+        with transaction.atomic():
+            user, _ = User.objects.get_or_create(
+                username=username,
+                email=email,
+            )
+            confirmation_code = default_token_generator.make_token(user)
+            user.confirmation_code = confirmation_code
+            user.save()
+            # Письмо отправит команда send_outbox, запрос её не ждёт.
+            OutgoingEmail.objects.enqueue(
+                subject='Регистрация на YaMDb',
+                body=f'Ваш код подтверждения: {confirmation_code}',
+                to=user.email,
+                from_email=settings.DEFAULT_FROM_EMAIL,
+            )
     except IntegrityError:
         return Response('Указанные данные не корректны',
                         status=status.HTTP_400_BAD_REQUEST)
-    confirmation_code = default_token_generator.make_token(user)
-    user.confirmation_code = confirmation_code
-    user.save()
-    send_mail(
-        subject='Регистрация на YaMDb',
-        message=f'Ваш код подтверждения: {confirmation_code}',
-        from_email=settings.DEFAULT_FROM_EMAIL,
-        recipient_list=(user.email,),
-    )
     return Response(serializer.data, status=status.HTTP_200_OK)
 
 
 @api_view(('POST',))
 @permission_classes((permissions.AllowAny,))
+@throttle_classes((TokenThrottle,))
 def get_jwt_token(request):
     serializer = TokenSerializer(data=request.data)
     serializer.is_valid(raise_exception=True)
@@ -149,8 +349,7 @@ class UserViewSet(viewsets.ModelViewSet):
     serializer_class = UserSerializer
     pagination_class = PageNumberPagination
     permission_classes = (IsAdmin,)
-    filter_backends = (SearchFilter, DjangoFilterBackend,)
-    search_fields = ('username',)
+    filter_backends = (UserSearchFilter, DjangoFilterBackend,)
     http_method_names = ('get', 'post', 'patch', 'delete')
 
     @action(
@@ -164,7 +363,8 @@ class UserViewSet(viewsets.ModelViewSet):
         serializer_class=UserEditSerializer,
     )
     def users_own_profile(self, request):
-        user = request.user
+        # request.user - снимок для проверки прав, профиль читаем целиком.
+        user = get_object_or_404(User, pk=request.user.pk)
         if request.method == 'GET':
             serializer = self.get_serializer(user)
             return Response(serializer.data, status=status.HTTP_200_OK)
@@ -178,3 +378,75 @@ class UserViewSet(viewsets.ModelViewSet):
             serializer.save()
             return Response(serializer.data, status=status.HTTP_200_OK)
         return Response(status=status.HTTP_405_METHOD_NOT_ALLOWED)
+
+    @action(
+        methods=('post',),
+        detail=False,
+        url_path='bulk-update',
+        serializer_class=UserBulkUpdateSerializer,
+    )
+    def bulk_update(self, request):
+        """Массовое изменение роли и профиля по списку username."""
+        serializer = self.get_serializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        return Response(serializer.save(), status=status.HTTP_200_OK)
+
+    @action(
+        methods=('get',),
+        detail=False,
+        url_path='me/reviews',
+        permission_classes=(permissions.IsAuthenticated,),
+        pagination_class=AuthorReviewCursorPagination,
+    )
+    def own_reviews(self, request):
+        """Отзывы текущего пользователя от новых к старым."""
+        return self.author_page(
+            request.user.reviews.select_related('author', 'title'),
+            ReviewSerializer,
+        )
+
+    @action(
+        methods=('get',),
+        detail=False,
+        url_path='me/comments',
+        permission_classes=(permissions.IsAuthenticated,),
+        pagination_class=AuthorCommentCursorPagination,
+    )
+    def own_comments(self, request):
+        """Комментарии текущего пользователя от новых к старым."""
+        return self.author_page(
+            request.user.comments.select_related('author'), CommentSerializer
+        )
+
+    @action(
+        methods=('get',),
+        detail=True,
+        permission_classes=(permissions.AllowAny,),
+        pagination_class=AuthorReviewCursorPagination,
+    )
+    def reviews(self, request, username=None):
+        """Отзывы пользователя для страницы профиля."""
+        user = get_object_or_404(User, username=username)
+        return self.author_page(
+            user.reviews.select_related('author', 'title'), ReviewSerializer
+        )
+
+    @action(
+        methods=('get',),
+        detail=True,
+        permission_classes=(permissions.AllowAny,),
+        pagination_class=AuthorCommentCursorPagination,
+    )
+    def comments(self, request, username=None):
+        """Комментарии пользователя для страницы профиля."""
+        user = get_object_or_404(User, username=username)
+        return self.author_page(
+            user.comments.select_related('author'), CommentSerializer
+        )
+
+    def author_page(self, queryset, serializer_class):
+        page = self.paginate_queryset(queryset)
+        serializer = serializer_class(
+            page, many=True, context=self.get_serializer_context()
+        )
+        return self.get_paginated_response(serializer.data)
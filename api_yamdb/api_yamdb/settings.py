@@ -71,6 +71,28 @@ DATABASES = {
 }
 
 
+# Cache
+
+# Метки версий, закэшированные ответы и вёдра троттлинга должны быть общими
+# для всех процессов и не нагружать SQLite, поэтому кэш - memcached.
+# LocMemCache подставляется только в тестах.
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.memcached.PyMemcacheCache',
+        'LOCATION': '127.0.0.1:11211',
+        # Недоступный memcached не роняет запросы: ответы просто не
+        # кэшируются, а метки версий и снимков каждый раз создаются заново.
+        'OPTIONS': {
+            'ignore_exc': True,
+            'connect_timeout': 0.5,
+            'timeout': 0.5,
+        },
+    }
+}
+
+CATALOG_CACHE_TIMEOUT = 60 * 5
+
+
 # Password validation
 
 AUTH_PASSWORD_VALIDATORS = [
@@ -116,9 +138,19 @@ EMAIL_FILE_PATH = (BASE_DIR / 'sent_emails')
 
 DEFAULT_FROM_EMAIL = 'fake@yamdb.fake'
 
+EMAIL_OUTBOX_BATCH_SIZE = 100
+
+EMAIL_OUTBOX_MAX_ATTEMPTS = 5
+
+EMAIL_OUTBOX_RETRY_DELAY = 60
+
+# На столько секунд send_outbox захватывает письмо перед отправкой; должно
+# быть заметно больше времени отправки одного письма.
+EMAIL_OUTBOX_LEASE = 300
+
 REST_FRAMEWORK = {
     'DEFAULT_AUTHENTICATION_CLASSES': [
-        'rest_framework_simplejwt.authentication.JWTAuthentication',
+        'api.v1.authentication.SnapshotJWTAuthentication',
     ],
     'DEFAULT_PERMISSION_CLASSES': [
         'rest_framework.permissions.IsAuthenticated',
@@ -126,6 +158,15 @@ REST_FRAMEWORK = {
     'DEFAULT_PAGINATION_CLASS': 'rest_framework.pagination.'
                                 'PageNumberPagination',
     'PAGE_SIZE': 10,
+    # Число обратных прокси перед приложением: IP клиента для троттлинга
+    # берётся из X-Forwarded-For только на столько адресов от конца.
+    'NUM_PROXIES': 0,
+    'DEFAULT_THROTTLE_RATES': {
+        'signup_ip': '30/hour',
+        'signup_identity': '5/hour',
+        'token_ip': '60/hour',
+        'token_identity': '10/hour',
+    },
 }
 
 SIMPLE_JWT = {
@@ -133,5 +174,13 @@ SIMPLE_JWT = {
     'AUTH_HEADER_TYPES': ('Bearer',),
 }
 
+AUTH_USER_SNAPSHOT_SIZE = 10000
+
+AUTH_USER_SNAPSHOT_TIMEOUT = 60
+
+BULK_CREATE_MAX_ITEMS = 1000
+
+TOP_TITLES_PRIOR_WEIGHT = 10
+
 LEN_DATA_USER = 150
 LEN_DATA_EMAIL = 254
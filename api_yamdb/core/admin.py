@@ -0,0 +1,12 @@
+from django.contrib import admin
+
+from .models import OutgoingEmail
+
+
+@admin.register(OutgoingEmail)
+class OutgoingEmailAdmin(admin.ModelAdmin):
+    list_display = (
+        'pk', 'to', 'subject', 'created_at', 'attempts', 'sent_at')
+    list_filter = ('sent_at',)
+    search_fields = ('to',)
+    readonly_fields = ('created_at',)
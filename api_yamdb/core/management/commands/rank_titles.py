@@ -0,0 +1,20 @@
+from django.conf import settings
+from django.core.management import BaseCommand
+
+from reviews.models import TitleRank
+
+
+class Command(BaseCommand):
+    help = 'Rebuilds the materialized top of titles by weighted rating'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--prior-weight',
+            type=int,
+            default=settings.TOP_TITLES_PRIOR_WEIGHT,
+            help='Number of catalog-average votes added to every title',
+        )
+
+    def handle(self, *args, **options):
+        ranked = TitleRank.objects.rebuild(options['prior_weight'])
+        self.stdout.write(f'Ranked {ranked} titles')
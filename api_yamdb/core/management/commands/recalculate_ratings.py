@@ -0,0 +1,11 @@
+from django.core.management import BaseCommand
+
+from reviews.models import Title
+
+
+class Command(BaseCommand):
+    help = 'Recalculates stored title ratings from reviews'
+
+    def handle(self, *args, **options):
+        updated = Title.objects.all().refresh_rating()
+        self.stdout.write(f'Ratings recalculated for {updated} titles')
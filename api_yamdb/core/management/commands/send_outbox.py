@@ -0,0 +1,110 @@
+import time
+from collections import Counter
+
+from django.conf import settings
+from django.core.mail import get_connection
+from django.core.management import BaseCommand
+from django.db.models import F
+from django.utils import timezone
+
+from core.models import OutgoingEmail
+
+
+class Command(BaseCommand):
+    help = 'Sends queued emails from the outbox over one mail connection'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=settings.EMAIL_OUTBOX_BATCH_SIZE,
+        )
+        parser.add_argument(
+            '--max-attempts',
+            type=int,
+            default=settings.EMAIL_OUTBOX_MAX_ATTEMPTS,
+        )
+        parser.add_argument(
+            '--retry-delay',
+            type=int,
+            default=settings.EMAIL_OUTBOX_RETRY_DELAY,
+            help='Seconds before the first retry, doubled after each failure',
+        )
+        parser.add_argument(
+            '--lease',
+            type=int,
+            default=settings.EMAIL_OUTBOX_LEASE,
+            help='Seconds an email stays claimed by this worker while sending',
+        )
+        parser.add_argument(
+            '--poll',
+            type=float,
+            default=0,
+            help='Keep running and check the outbox every N seconds',
+        )
+
+    def handle(self, *args, **options):
+        self.stats = Counter(sent=0, retried=0, failed=0, skipped=0)
+        connection = get_connection()
+        try:
+            while True:
+                self.drain(connection, **options)
+                if not options['poll']:
+                    break
+                time.sleep(options['poll'])
+        except KeyboardInterrupt:
+            pass
+        finally:
+            connection.close()
+        self.stdout.write(
+            'Sent {sent}, will retry {retried}, gave up on {failed}'.format(
+                **self.stats
+            )
+        )
+
+    def drain(self, connection, batch_size, max_attempts, retry_delay,
+              lease, **options):
+        while True:
+            batch = list(
+                OutgoingEmail.objects.due(max_attempts)[:batch_size]
+            )
+            if not batch:
+                return
+            try:
+                connection.open()
+            except OSError as error:
+                self.stderr.write(f'Mail server is unavailable: {error}')
+                return
+            results = Counter(
+                self.send(connection, email, max_attempts, retry_delay, lease)
+                for email in batch
+            )
+            self.stats.update(results)
+            if options['verbosity'] > 1:
+                self.stdout.write(
+                    f'Batch of {len(batch)}: sent {results["sent"]}, '
+                    f'failed {results["retried"] + results["failed"]}'
+                )
+
+    def send(self, connection, email, max_attempts, retry_delay, lease):
+        '''Отправляет одно письмо и возвращает ключ для статистики.'''
+        # Несколько процессов могут выбрать одно письмо: отправит его
+        # только тот, кто первым перенесёт попытку.
+        if not email.claim(lease):
+            return 'skipped'
+        try:
+            connection.send_messages([email.as_message(connection)])
+        except Exception as error:
+            # После ошибки SMTP соединение может быть разорвано.
+            connection.close()
+            email.postpone(error, retry_delay)
+            email.save(
+                update_fields=('attempts', 'next_attempt_at', 'last_error')
+            )
+            return 'failed' if email.attempts >= max_attempts else 'retried'
+        # Отмечаем сразу, чтобы прерванная команда не отправила письмо
+        # повторно.
+        OutgoingEmail.objects.filter(pk=email.pk).update(
+            sent_at=timezone.now(), attempts=F('attempts') + 1
+        )
+        return 'sent'
@@ -0,0 +1,94 @@
+from datetime import timedelta
+
+from django.core.mail import EmailMessage
+from django.db import models
+from django.utils import timezone
+
+
+class OutgoingEmailQuerySet(models.QuerySet):
+
+    def enqueue(self, subject, body, to, from_email=None):
+        '''Ставит письмо в очередь; вызывать в транзакции с изменениями.'''
+        return self.create(
+            subject=subject, body=body, to=to, from_email=from_email or '',
+        )
+
+    def due(self, max_attempts, now=None):
+        '''Неотправленные письма, для которых подошло время попытки.'''
+        return self.filter(
+            sent_at__isnull=True,
+            attempts__lt=max_attempts,
+            next_attempt_at__lte=now or timezone.now(),
+        ).order_by('next_attempt_at', 'pk')
+
+
+class OutgoingEmail(models.Model):
+    '''Письмо в исходящей очереди.
+
+    Запись создаётся в одной транзакции с изменением, ради которого
+    отправляется письмо, а отправляет её команда ``send_outbox``.
+    '''
+    subject = models.CharField('Тема', max_length=255)
+    body = models.TextField('Текст')
+    from_email = models.CharField('Отправитель', max_length=254, blank=True)
+    to = models.EmailField('Получатель')
+    created_at = models.DateTimeField('Создано', auto_now_add=True)
+    next_attempt_at = models.DateTimeField(
+        'Следующая попытка', default=timezone.now
+    )
+    attempts = models.PositiveSmallIntegerField('Попыток', default=0)
+    sent_at = models.DateTimeField('Отправлено', null=True, blank=True)
+    last_error = models.TextField('Последняя ошибка', blank=True)
+
+    objects = OutgoingEmailQuerySet.as_manager()
+
+    class Meta:
+        indexes = (
+            models.Index(
+                fields=('sent_at', 'next_attempt_at'),
+                name='outgoing_email_due_idx',
+            ),
+        )
+        verbose_name = 'Исходящее письмо'
+        verbose_name_plural = 'Исходящие письма'
+
+    def __str__(self):
+        return f'{self.to}: {self.subject}'
+
+    def as_message(self, connection):
+        return EmailMessage(
+            subject=self.subject,
+            body=self.body,
+            from_email=self.from_email or None,
+            to=(self.to,),
+            connection=connection,
+        )
+
+    def claim(self, lease, now=None):
+        '''Захватывает письмо для отправки на lease секунд.
+
+        Попытка переносится вперёд условным UPDATE: если другой процесс
+        уже захватил или отправил письмо, строка не изменится и метод
+        вернёт False. Если процесс упадёт, не успев отметить письмо,
+        его повторит другой процесс по истечении lease.
+        '''
+        next_attempt_at = (now or timezone.now()) + timedelta(seconds=lease)
+        claimed = type(self).objects.filter(
+            pk=self.pk,
+            sent_at__isnull=True,
+            next_attempt_at=self.next_attempt_at,
+        ).update(next_attempt_at=next_attempt_at)
+        if claimed:
+            self.next_attempt_at = next_attempt_at
+        return bool(claimed)
+
+    def postpone(self, error, base_delay, now=None):
+        '''Записывает неудачную попытку и откладывает следующую.
+
+        Задержка растёт экспоненциально: base_delay, 2 * base_delay, ...
+        '''
+        self.attempts += 1
+        self.last_error = str(error)
+        self.next_attempt_at = (now or timezone.now()) + timedelta(
+            seconds=base_delay * 2 ** (self.attempts - 1)
+        )
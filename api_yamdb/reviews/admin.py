@@ -1,6 +1,6 @@
 from django.contrib import admin
 
-from .models import Category, Comment, Genre, Review, Title, User
+from .models import Category, Comment, Genre, Review, Title, TitleRank, User
 
 
 @admin.register(User)
@@ -24,7 +24,8 @@ class GenreAdmin(admin.ModelAdmin):
 
 @admin.register(Title)
 class TitleAdmin(admin.ModelAdmin):
-    list_display = ('pk', 'name', 'year', 'category', 'description')
+    list_display = (
+        'pk', 'name', 'year', 'category', 'description', 'rating')
     list_editable = ('name', 'year', 'description')
     search_fields = ('name', 'year', 'category', 'genre')
     list_filter = ('name', 'year', 'category', 'genre')
@@ -44,3 +45,9 @@ class CommentAdmin(admin.ModelAdmin):
     search_fields = ('author', 'review', 'text')
     list_filter = ('author', 'review', 'pub_date')
     list_editable = ('text',)
+
+
+@admin.register(TitleRank)
+class TitleRankAdmin(admin.ModelAdmin):
+    list_display = ('position', 'title', 'weighted_rating')
+    list_select_related = ('title',)
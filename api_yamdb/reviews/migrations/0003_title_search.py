@@ -0,0 +1,32 @@
+from django.db import migrations
+
+from reviews.search import SEARCH_TABLE, is_supported
+
+
+def create_search_table(apps, schema_editor):
+    if not is_supported(schema_editor.connection):
+        return
+    schema_editor.execute(
+        f'CREATE VIRTUAL TABLE {SEARCH_TABLE} '
+        'USING fts5(name, description)'
+    )
+    schema_editor.execute(
+        f'INSERT INTO {SEARCH_TABLE} (rowid, name, description) '
+        'SELECT id, name, description FROM reviews_title'
+    )
+
+
+def drop_search_table(apps, schema_editor):
+    if is_supported(schema_editor.connection):
+        schema_editor.execute(f'DROP TABLE IF EXISTS {SEARCH_TABLE}')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('reviews', '0002_title_rating'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_search_table, drop_search_table),
+    ]
@@ -0,0 +1,27 @@
+# Generated by Django 3.2 on 2026-10-18 05:08
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('reviews', '0007_author_pub_date_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='TitleRank',
+            fields=[
+                ('title', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='rank', serialize=False, to='reviews.title', verbose_name='Произведение')),
+                ('position', models.PositiveIntegerField(unique=True, verbose_name='Место')),
+                ('weighted_rating', models.FloatField(verbose_name='Взвешенный рейтинг')),
+            ],
+            options={
+                'verbose_name': 'Место в топе',
+                'verbose_name_plural': 'Топ произведений',
+                'ordering': ('position',),
+            },
+        ),
+    ]
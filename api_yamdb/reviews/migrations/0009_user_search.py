@@ -0,0 +1,34 @@
+from django.db import migrations
+
+from reviews.search import USER_SEARCH_TABLE, is_trigram_supported
+
+
+def create_user_search_table(apps, schema_editor):
+    if not is_trigram_supported(schema_editor.connection):
+        return
+    schema_editor.execute(
+        f'CREATE VIRTUAL TABLE {USER_SEARCH_TABLE} '
+        "USING fts5(username, email, tokenize='trigram')"
+    )
+    schema_editor.execute(
+        f'INSERT INTO {USER_SEARCH_TABLE} (rowid, username, email) '
+        'SELECT id, username, email FROM reviews_user'
+    )
+
+
+def drop_user_search_table(apps, schema_editor):
+    if is_trigram_supported(schema_editor.connection):
+        schema_editor.execute(f'DROP TABLE IF EXISTS {USER_SEARCH_TABLE}')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('reviews', '0008_title_rank'),
+    ]
+
+    operations = [
+        migrations.RunPython(
+            create_user_search_table, drop_user_search_table
+        ),
+    ]
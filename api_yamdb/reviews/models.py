@@ -1,10 +1,18 @@
+from collections import Counter
+
 from django.contrib.auth.models import AbstractUser
 from django.core.validators import (
     MaxValueValidator, MinValueValidator, validate_email,
 )
-from django.db import models
-from django.db.models import Q
+from django.db import models, transaction
+from django.db.models import (
+    Case, Count, ExpressionWrapper, F, OuterRef, Q, Subquery, Sum, When,
+    Window,
+)
+from django.db.models.expressions import RawSQL
+from django.db.models.functions import Coalesce, RowNumber
 
+from .search import search_titles
 from .validators import UsernameRegexValidator, validate_year
 
 
@@ -121,6 +129,81 @@ class Genre(models.Model):
         return self.slug
 
 
+SCORES = range(1, 11)
+
+
+def score_count_field(score):
+    '''Имя поля Title со счётчиком отзывов с данной оценкой.'''
+    return f'score_{score}_count'
+
+
+SCORE_COUNT_FIELDS = tuple(score_count_field(score) for score in SCORES)
+
+
+class TitleQuerySet(models.QuerySet):
+
+    def shift_rating(self, added=(), removed=()):
+        '''Учитывает добавленные и исключённые оценки отзывов.
+
+        Сумма оценок, число отзывов, рейтинг и гистограмма оценок
+        сдвигаются одним UPDATE на уровне БД, поэтому параллельные
+        изменения отзывов не теряются. Оценки приводятся к int: при
+        создании отзыва без валидации (например, в ``import_csv``) они
+        приходят строками.
+        '''
+        added = [int(score) for score in added]
+        removed = [int(score) for score in removed]
+        histogram = Counter(added)
+        histogram.subtract(removed)
+        count_delta = len(added) - len(removed)
+        new_sum = F('rating_sum') + (sum(added) - sum(removed))
+        new_count = F('review_count') + count_delta
+        return self.update(
+            rating_sum=new_sum,
+            review_count=new_count,
+            rating=Case(
+                When(review_count__gt=-count_delta, then=new_sum / new_count),
+                default=None,
+            ),
+            **{
+                score_count_field(score): F(score_count_field(score)) + delta
+                for score, delta in histogram.items() if delta
+            },
+        )
+
+    def refresh_rating(self):
+        '''Пересчитывает рейтинг произведений по всем их отзывам.'''
+        reviews = Review.objects.filter(
+            title=OuterRef('pk')
+        ).order_by().values('title')
+        return self.update(
+            rating_sum=Coalesce(
+                Subquery(reviews.annotate(total=Sum('score')).values('total')),
+                0,
+            ),
+            review_count=Coalesce(
+                Subquery(reviews.annotate(total=Count('pk')).values('total')),
+                0,
+            ),
+            rating=Subquery(reviews.annotate(average=ExpressionWrapper(
+                Sum('score') / Count('pk'),
+                output_field=models.PositiveSmallIntegerField(),
+            )).values('average')),
+            **{
+                score_count_field(score): Coalesce(Subquery(
+                    reviews.filter(score=score).annotate(
+                        total=Count('pk')
+                    ).values('total')
+                ), 0)
+                for score in SCORES
+            },
+        )
+
+    def search(self, text):
+        '''Полнотекстовый поиск по названию и описанию.'''
+        return search_titles(self, text)
+
+
 class Title(models.Model):
     '''Модель произведения.'''
 
@@ -147,6 +230,60 @@ class Title(models.Model):
         on_delete=models.SET_NULL,
         related_name='titles',
         verbose_name='Категория',)
+    rating_sum = models.PositiveIntegerField(
+        'Сумма оценок',
+        default=0,
+        editable=False,)
+    review_count = models.PositiveIntegerField(
+        'Количество отзывов',
+        default=0,
+        editable=False,)
+    rating = models.PositiveSmallIntegerField(
+        'Рейтинг',
+        null=True,
+        editable=False,)
+    score_1_count = models.PositiveIntegerField(
+        'Отзывов с оценкой 1',
+        default=0,
+        editable=False,)
+    score_2_count = models.PositiveIntegerField(
+        'Отзывов с оценкой 2',
+        default=0,
+        editable=False,)
+    score_3_count = models.PositiveIntegerField(
+        'Отзывов с оценкой 3',
+        default=0,
+        editable=False,)
+    score_4_count = models.PositiveIntegerField(
+        'Отзывов с оценкой 4',
+        default=0,
+        editable=False,)
+    score_5_count = models.PositiveIntegerField(
+        'Отзывов с оценкой 5',
+        default=0,
+        editable=False,)
+    score_6_count = models.PositiveIntegerField(
+        'Отзывов с оценкой 6',
+        default=0,
+        editable=False,)
+    score_7_count = models.PositiveIntegerField(
+        'Отзывов с оценкой 7',
+        default=0,
+        editable=False,)
+    score_8_count = models.PositiveIntegerField(
+        'Отзывов с оценкой 8',
+        default=0,
+        editable=False,)
+    score_9_count = models.PositiveIntegerField(
+        'Отзывов с оценкой 9',
+        default=0,
+        editable=False,)
+    score_10_count = models.PositiveIntegerField(
+        'Отзывов с оценкой 10',
+        default=0,
+        editable=False,)
+
+    objects = TitleQuerySet.as_manager()
 
     class Meta:
         verbose_name = 'Произведение'
@@ -156,6 +293,13 @@ class Title(models.Model):
     def __str__(self):
         return self.name
 
+    @property
+    def rating_distribution(self):
+        return {
+            score: getattr(self, score_count_field(score))
+            for score in SCORES
+        }
+
 
 class GenreTitle(models.Model):
     '''Служебная модель для БД.'''
@@ -178,6 +322,71 @@ class GenreTitle(models.Model):
         return f'{self.title} {self.genre}'
 
 
+class TitleRankQuerySet(models.QuerySet):
+
+    def rebuild(self, prior_weight, batch_size=1000):
+        '''Пересчитывает места произведений по взвешенному рейтингу.
+
+        Средняя оценка произведения сглаживается к средней по каталогу
+        с весом ``prior_weight`` отзывов (байесовская оценка), поэтому
+        одна десятка не обгоняет произведения с сотнями отзывов.
+        Суммы и число оценок берутся из счётчиков Title без чтения
+        отзывов, таблица мест заменяется целиком в одной транзакции.
+        '''
+        stats = list(Title.objects.filter(review_count__gt=0).values_list(
+            'pk', 'rating_sum', 'review_count'
+        ))
+        total = sum(count for _, _, count in stats)
+        mean = sum(score for _, score, _ in stats) / total if total else 0
+        weighted = sorted(
+            (
+                (
+                    (score + prior_weight * mean) / (count + prior_weight),
+                    count,
+                    pk,
+                )
+                for pk, score, count in stats
+            ),
+            key=lambda item: (-item[0], -item[1], item[2]),
+        )
+        with transaction.atomic(using=self.db):
+            self.all().delete()
+            self.bulk_create(
+                (
+                    self.model(
+                        title_id=pk, position=position,
+                        weighted_rating=rating,
+                    )
+                    for position, (rating, _, pk) in enumerate(weighted, 1)
+                ),
+                batch_size=batch_size,
+            )
+        return len(weighted)
+
+
+class TitleRank(models.Model):
+    '''Материализованное место произведения в топе.'''
+    title = models.OneToOneField(
+        Title,
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name='rank',
+        verbose_name='Произведение',
+    )
+    position = models.PositiveIntegerField('Место', unique=True)
+    weighted_rating = models.FloatField('Взвешенный рейтинг')
+
+    objects = TitleRankQuerySet.as_manager()
+
+    class Meta:
+        ordering = ('position',)
+        verbose_name = 'Место в топе'
+        verbose_name_plural = 'Топ произведений'
+
+    def __str__(self):
+        return f'{self.position}. {self.title_id}'
+
+
 class Review(models.Model):
     '''Модель отзыва.'''
     author = models.ForeignKey(
@@ -209,6 +418,11 @@ class Review(models.Model):
         auto_now_add=True,
         db_index=True,
     )
+    comment_count = models.PositiveIntegerField(
+        verbose_name='Количество комментариев',
+        default=0,
+        editable=False,
+    )
 
     class Meta:
         constraints = (
@@ -217,6 +431,20 @@ class Review(models.Model):
                 name='unique_review',
             ),
         )
+        indexes = (
+            models.Index(
+                fields=('title', 'pub_date'),
+                name='review_title_pub_date_idx',
+            ),
+            models.Index(
+                fields=('title', 'comment_count'),
+                name='review_title_comments_idx',
+            ),
+            models.Index(
+                fields=('author', 'pub_date'),
+                name='review_author_pub_date_idx',
+            ),
+        )
         ordering = ('-pub_date',)
         verbose_name = 'Отзыв'
         verbose_name_plural = 'Отзывы'
@@ -224,6 +452,46 @@ class Review(models.Model):
     def __str__(self):
         return self.text[:30]
 
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        instance.remember_rating_state()
+        return instance
+
+    def remember_rating_state(self):
+        '''Запоминает произведение и оценку, учтённые в рейтинге.'''
+        self._rating_state = (
+            self.__dict__.get('title_id'), self.__dict__.get('score')
+        )
+
+    def save(self, *args, **kwargs):
+        # Пересчёт рейтинга в сигнале должен попасть в ту же транзакцию.
+        with transaction.atomic(using=kwargs.get('using')):
+            super().save(*args, **kwargs)
+
+
+class CommentQuerySet(models.QuerySet):
+
+    def latest_for_reviews(self, review_ids, limit):
+        '''Последние ``limit`` комментариев каждого из отзывов.
+
+        Комментарии нумеруются ROW_NUMBER() OVER (PARTITION BY review_id)
+        во вложенном запросе, поэтому все отзывы страницы обходятся
+        одним запросом к БД, а не запросом на отзыв.
+        '''
+        ranked = self.model.objects.filter(
+            review_id__in=review_ids
+        ).annotate(row_number=Window(
+            RowNumber(),
+            partition_by=(F('review_id'),),
+            order_by=(F('pub_date').desc(), F('id').desc()),
+        )).order_by().values('id', 'row_number')
+        sql, params = ranked.query.sql_with_params()
+        return self.filter(pk__in=RawSQL(
+            f'SELECT id FROM ({sql}) WHERE row_number <= %s',
+            (*params, limit),
+        )).order_by('review_id', '-pub_date', '-id')
+
 
 class Comment(models.Model):
     '''Модель комментария к отзыву.'''
@@ -249,10 +517,37 @@ class Comment(models.Model):
         help_text='Текст комментария',
     )
 
+    objects = CommentQuerySet.as_manager()
+
     class Meta:
+        indexes = (
+            models.Index(
+                fields=('review', 'pub_date'),
+                name='comment_review_pub_date_idx',
+            ),
+            models.Index(
+                fields=('author', 'pub_date'),
+                name='comment_author_pub_date_idx',
+            ),
+        )
         ordering = ('-pub_date',)
         verbose_name = 'Комментарий'
         verbose_name_plural = 'Комментарии'
 
     def __str__(self):
         return self.text[:30]
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        instance.remember_counted_review()
+        return instance
+
+    def remember_counted_review(self):
+        '''Запоминает отзыв, в счётчике которого учтён комментарий.'''
+        self._counted_review_id = self.__dict__.get('review_id')
+
+    def save(self, *args, **kwargs):
+        # Счётчик комментариев в сигнале должен попасть в ту же транзакцию.
+        with transaction.atomic(using=kwargs.get('using')):
+            super().save(*args, **kwargs)
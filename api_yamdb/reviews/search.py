@@ -0,0 +1,143 @@
+'''Полнотекстовые индексы произведений и пользователей.
+
+В SQLite индексы хранятся в виртуальных таблицах FTS5, которые заполняют
+сигналы моделей ``Title`` и ``User``. Для пользователей используется
+токенизатор ``trigram``: он находит подстроку username или email по
+триграммам, а не полным перебором. На других СУБД таблицы не создаются,
+а поиск откатывается к ``icontains``.
+'''
+import re
+
+from django.db import connections, router
+from django.db.models import F, FloatField, Q
+from django.db.models.expressions import RawSQL
+
+SEARCH_TABLE = 'reviews_title_search'
+
+TITLE_COLUMNS = ('name', 'description')
+
+USER_SEARCH_TABLE = 'reviews_user_search'
+
+USER_COLUMNS = ('username', 'email')
+
+# Триграммы не находят строки короче трёх символов.
+TRIGRAM_MIN_LENGTH = 3
+
+TERM_RE = re.compile(r'\w+')
+
+
+def is_supported(connection):
+    return connection.vendor == 'sqlite'
+
+
+def build_match(text):
+    '''Превращает ввод пользователя в безопасный запрос FTS5.
+
+    Каждое слово ищется по префиксу, слова объединяются через AND.
+    '''
+    return ' '.join(f'"{term}"*' for term in TERM_RE.findall(text))
+
+
+def is_trigram_supported(connection):
+    return (
+        is_supported(connection)
+        and connection.Database.sqlite_version_info >= (3, 34, 0)
+    )
+
+
+def build_phrase(text):
+    '''Запрос FTS5, совпадающий с подстрокой ``text``.'''
+    return '"{}"'.format(text.replace('"', '""'))
+
+
+def replace_rows(table, objs, columns, supported=is_supported):
+    '''Добавляет или обновляет объекты в таблице FTS5 ``table``.'''
+    objs = list(objs)
+    if not objs:
+        return
+    connection = connections[router.db_for_write(objs[0].__class__)]
+    if not supported(connection):
+        return
+    with connection.cursor() as cursor:
+        cursor.executemany(
+            f'DELETE FROM {table} WHERE rowid = %s',
+            [(obj.pk,) for obj in objs],
+        )
+        cursor.executemany(
+            f'INSERT INTO {table} (rowid, {", ".join(columns)}) '
+            f'VALUES (%s{", %s" * len(columns)})',
+            [
+                (obj.pk, *(getattr(obj, column) for column in columns))
+                for obj in objs
+            ],
+        )
+
+
+def delete_rows(table, model, pks, supported=is_supported):
+    '''Удаляет объекты из таблицы FTS5 ``table``.'''
+    connection = connections[router.db_for_write(model)]
+    if not pks or not supported(connection):
+        return
+    with connection.cursor() as cursor:
+        cursor.executemany(
+            f'DELETE FROM {table} WHERE rowid = %s',
+            [(pk,) for pk in pks],
+        )
+
+
+def index_titles(titles):
+    '''Добавляет или обновляет произведения в поисковом индексе.'''
+    replace_rows(SEARCH_TABLE, titles, TITLE_COLUMNS)
+
+
+def unindex_titles(model, pks):
+    '''Удаляет произведения из поискового индекса.'''
+    delete_rows(SEARCH_TABLE, model, pks)
+
+
+def index_users(users):
+    '''Добавляет или обновляет пользователей в триграммном индексе.'''
+    replace_rows(
+        USER_SEARCH_TABLE, users, USER_COLUMNS, is_trigram_supported
+    )
+
+
+def unindex_users(model, pks):
+    '''Удаляет пользователей из триграммного индекса.'''
+    delete_rows(USER_SEARCH_TABLE, model, pks, is_trigram_supported)
+
+
+def search_titles(queryset, text):
+    '''Фильтрует произведения по тексту и сортирует по релевантности.'''
+    match = build_match(text)
+    if not match:
+        return queryset.none()
+    if not is_supported(connections[queryset.db]):
+        return queryset.filter(
+            Q(name__icontains=text) | Q(description__icontains=text)
+        )
+    table = queryset.model._meta.db_table
+    return queryset.filter(pk__in=RawSQL(
+        f'SELECT rowid FROM {SEARCH_TABLE} WHERE {SEARCH_TABLE} MATCH %s',
+        (match,),
+    )).annotate(search_rank=RawSQL(
+        f'SELECT rank FROM {SEARCH_TABLE} WHERE {SEARCH_TABLE} MATCH %s '
+        f'AND rowid = "{table}"."id"',
+        (match,),
+        output_field=FloatField(),
+    )).order_by(F('search_rank').asc(), 'pk')
+
+
+def search_users(queryset, text):
+    '''Фильтрует пользователей по подстроке username или email.'''
+    if len(text) < TRIGRAM_MIN_LENGTH or not is_trigram_supported(
+        connections[queryset.db]
+    ):
+        return queryset.filter(
+            Q(username__icontains=text) | Q(email__icontains=text)
+        )
+    return queryset.filter(pk__in=RawSQL(
+        f'SELECT rowid FROM {USER_SEARCH_TABLE} '
+        f'WHERE {USER_SEARCH_TABLE} MATCH %s',
+        (build_phrase(text),),
+    ))
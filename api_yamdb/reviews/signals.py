@@ -0,0 +1,89 @@
+from django.db.models import F
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from . import search
+from .models import Comment, Review, Title, User
+
+
+@receiver(post_save, sender=Review)
+def update_rating_on_review_save(sender, instance, created, **kwargs):
+    '''Учитывает новую или изменённую оценку в рейтинге произведения.'''
+    old_title_id, old_score = getattr(
+        instance, '_rating_state', (None, None)
+    )
+    if created:
+        Title.objects.filter(pk=instance.title_id).shift_rating(
+            added=(instance.score,)
+        )
+    elif old_title_id is None or old_score is None:
+        Title.objects.filter(pk=instance.title_id).refresh_rating()
+    elif old_title_id == instance.title_id:
+        if old_score != instance.score:
+            Title.objects.filter(pk=instance.title_id).shift_rating(
+                added=(instance.score,), removed=(old_score,)
+            )
+    else:
+        Title.objects.filter(pk=old_title_id).shift_rating(
+            removed=(old_score,)
+        )
+        Title.objects.filter(pk=instance.title_id).shift_rating(
+            added=(instance.score,)
+        )
+    instance.remember_rating_state()
+
+
+@receiver(post_delete, sender=Review)
+def update_rating_on_review_delete(sender, instance, **kwargs):
+    '''Исключает оценку удалённого отзыва из рейтинга произведения.
+
+    Срабатывает и при каскадном удалении отзывов вместе с автором.
+    '''
+    title_id, score = getattr(instance, '_rating_state', (None, None))
+    if title_id is None or score is None:
+        title_id, score = instance.title_id, instance.score
+    Title.objects.filter(pk=title_id).shift_rating(removed=(score,))
+
+
+@receiver(post_save, sender=Title)
+def index_title(sender, instance, **kwargs):
+    search.index_titles((instance,))
+
+
+@receiver(post_delete, sender=Title)
+def unindex_title(sender, instance, **kwargs):
+    search.unindex_titles(sender, (instance.pk,))
+
+
+@receiver(post_save, sender=User)
+def index_user(sender, instance, **kwargs):
+    search.index_users((instance,))
+
+
+@receiver(post_delete, sender=User)
+def unindex_user(sender, instance, **kwargs):
+    search.unindex_users(sender, (instance.pk,))
+
+
+@receiver(post_save, sender=Comment)
+def update_comment_count_on_save(sender, instance, created, **kwargs):
+    '''Учитывает новый или перенесённый комментарий в счётчике отзыва.'''
+    old_review_id = getattr(instance, '_counted_review_id', None)
+    moved = old_review_id is not None and old_review_id != instance.review_id
+    if created or moved:
+        Review.objects.filter(pk=instance.review_id).update(
+            comment_count=F('comment_count') + 1
+        )
+    if moved:
+        Review.objects.filter(pk=old_review_id).update(
+            comment_count=F('comment_count') - 1
+        )
+    instance.remember_counted_review()
+
+
+@receiver(post_delete, sender=Comment)
+def update_comment_count_on_delete(sender, instance, **kwargs):
+    '''Исключает удалённый комментарий из счётчика отзыва.'''
+    Review.objects.filter(pk=instance.review_id).update(
+        comment_count=F('comment_count') - 1
+    )
@@ -0,0 +1,25 @@
+import pytest
+
+from django.core.cache import cache
+from django.test import override_settings
+
+
+@pytest.fixture(autouse=True, scope='session')
+def locmem_cache():
+    with override_settings(CACHES={
+        'default': {
+            'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        },
+    }):
+        yield
+
+
+@pytest.fixture(autouse=True)
+def clear_cache():
+    from api.v1.authentication import user_snapshots
+
+    cache.clear()
+    user_snapshots.clear()
+    yield
+    cache.clear()
+    user_snapshots.clear()
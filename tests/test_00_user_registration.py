@@ -1,4 +1,5 @@
 from http import HTTPStatus
+from io import StringIO
 
 import pytest
 from tests.utils import (
@@ -7,6 +8,7 @@ from tests.utils import (
 )
 
 from django.core import mail
+from django.core.management import call_command
 from django.db.utils import IntegrityError
 
 
@@ -112,6 +114,11 @@ class Test00UserRegistration:
         }
 
         response = client.post(self.url_signup, data=valid_data)
+        assert len(mail.outbox) == outbox_before_count, (
+            f'Проверьте, что эндпоинт `{self.url_signup}` ставит письмо '
+            'в очередь, а не отправляет его во время запроса.'
+        )
+        call_command('send_outbox', stdout=StringIO())
         outbox_after = mail.outbox  # email outbox after user create
 
         assert response.status_code != HTTPStatus.NOT_FOUND, (
@@ -375,3 +382,223 @@ class Test00UserRegistration:
             'пользователя, созданного администратором,  возвращает ответ '
             'со статусом 200.'
         )
+
+    def test_signup_outbox_retries_failed_emails(self, client, monkeypatch):
+        from django.core.mail.backends.locmem import EmailBackend
+
+        from core.models import OutgoingEmail
+
+        for idx in range(3):
+            response = client.post(self.url_signup, data={
+                'email': f'outbox{idx}@yamdb.fake',
+                'username': f'outbox{idx}',
+            })
+            assert response.status_code == HTTPStatus.OK
+        assert OutgoingEmail.objects.filter(sent_at__isnull=True).count() == 3
+
+        send_messages = EmailBackend.send_messages
+
+        def flaky_send_messages(backend, messages):
+            if 'outbox1@yamdb.fake' in messages[0].to:
+                raise ConnectionRefusedError('SMTP is down')
+            return send_messages(backend, messages)
+
+        monkeypatch.setattr(EmailBackend, 'send_messages', flaky_send_messages)
+        stdout = StringIO()
+        call_command('send_outbox', batch_size=2, stdout=stdout)
+        assert sorted(message.to[0] for message in mail.outbox) == [
+            'outbox0@yamdb.fake', 'outbox2@yamdb.fake'
+        ], (
+            'Проверьте, что команда `send_outbox` отправляет письма из '
+            'очереди и не останавливается на ошибке одного письма.'
+        )
+        assert 'Sent 2, will retry 1' in stdout.getvalue()
+        failed = OutgoingEmail.objects.get(to='outbox1@yamdb.fake')
+        assert failed.sent_at is None and failed.attempts == 1
+        assert failed.next_attempt_at > failed.created_at, (
+            'Проверьте, что неудачная отправка откладывается.'
+        )
+
+        monkeypatch.setattr(EmailBackend, 'send_messages', send_messages)
+        call_command('send_outbox', stdout=StringIO())
+        assert len(mail.outbox) == 2, (
+            'Проверьте, что повторная отправка ждёт окончания задержки.'
+        )
+        OutgoingEmail.objects.update(next_attempt_at=failed.created_at)
+        call_command('send_outbox', stdout=StringIO())
+        assert len(mail.outbox) == 3
+        assert not OutgoingEmail.objects.filter(sent_at__isnull=True).exists()
+
+    def test_signup_outbox_claims_and_marks_each_email(self, client,
+                                                        monkeypatch):
+        from django.core.mail.backends.locmem import EmailBackend
+
+        from core.models import OutgoingEmail
+
+        for idx in range(3):
+            response = client.post(self.url_signup, data={
+                'email': f'claim{idx}@yamdb.fake',
+                'username': f'claim{idx}',
+            })
+            assert response.status_code == HTTPStatus.OK
+        stale = OutgoingEmail.objects.get(to='claim0@yamdb.fake')
+        assert OutgoingEmail.objects.get(pk=stale.pk).claim(300)
+        assert not stale.claim(300), (
+            'Проверьте, что письмо, захваченное другим процессом, '
+            'нельзя захватить повторно.'
+        )
+
+        send_messages = EmailBackend.send_messages
+
+        def broken_send_messages(backend, messages):
+            if 'claim1@yamdb.fake' in messages[0].to:
+                raise ValueError('Header values may not contain linefeed')
+            return send_messages(backend, messages)
+
+        monkeypatch.setattr(
+            EmailBackend, 'send_messages', broken_send_messages
+        )
+        stdout = StringIO()
+        call_command('send_outbox', stdout=stdout)
+        assert [message.to[0] for message in mail.outbox] == [
+            'claim2@yamdb.fake'
+        ], (
+            'Проверьте, что команда `send_outbox` пропускает захваченные '
+            'письма и не останавливается на любой ошибке одного письма.'
+        )
+        assert 'Sent 1, will retry 1' in stdout.getvalue()
+        assert OutgoingEmail.objects.get(
+            to='claim2@yamdb.fake'
+        ).sent_at is not None
+        assert OutgoingEmail.objects.get(
+            to='claim1@yamdb.fake'
+        ).last_error == 'Header values may not contain linefeed'
+
+    def test_signup_and_token_are_throttled(self, client, monkeypatch):
+        from api.v1.throttling import TokenBucketThrottle
+
+        monkeypatch.setitem(
+            TokenBucketThrottle.THROTTLE_RATES, 'signup_identity', '2/hour'
+        )
+        monkeypatch.setitem(
+            TokenBucketThrottle.THROTTLE_RATES, 'token_ip', '3/hour'
+        )
+        data = {'email': 'bot@yamdb.fake', 'username': 'bot'}
+        for _ in range(2):
+            response = client.post(self.url_signup, data=data)
+            assert response.status_code == HTTPStatus.OK
+        response = client.post(
+            self.url_signup, data={**data, 'username': 'other_bot'}
+        )
+        assert response.status_code == HTTPStatus.TOO_MANY_REQUESTS, (
+            f'Проверьте, что запросы к `{self.url_signup}` с одним и тем же '
+            '`email` ограничиваются.'
+        )
+        assert int(response['Retry-After']) > 0, (
+            'Проверьте, что ответ 429 содержит заголовок `Retry-After`.'
+        )
+        response = client.post(self.url_signup, data={
+            'email': 'human@yamdb.fake', 'username': 'human'
+        })
+        assert response.status_code == HTTPStatus.OK
+
+        for _ in range(3):
+            response = client.post(self.url_token, data={
+                'username': 'bot', 'confirmation_code': 'wrong'
+            })
+            assert response.status_code == HTTPStatus.BAD_REQUEST
+        response = client.post(self.url_token, data={
+            'username': 'human', 'confirmation_code': 'wrong'
+        })
+        assert response.status_code == HTTPStatus.TOO_MANY_REQUESTS, (
+            f'Проверьте, что запросы к `{self.url_token}` с одного IP '
+            'ограничиваются.'
+        )
+        assert 'Retry-After' in response
+
+    def test_token_throttle_uses_remote_addr_and_spares_rejected(
+            self, client, monkeypatch):
+        from api.v1.throttling import TokenBucketThrottle
+
+        monkeypatch.setitem(
+            TokenBucketThrottle.THROTTLE_RATES, 'token_ip', '3/hour'
+        )
+        monkeypatch.setitem(
+            TokenBucketThrottle.THROTTLE_RATES, 'token_identity', '1/hour'
+        )
+        data = {'username': 'bot', 'confirmation_code': 'wrong'}
+        response = client.post(self.url_token, data=data)
+        assert response.status_code == HTTPStatus.NOT_FOUND
+        for idx in range(3):
+            response = client.post(
+                self.url_token, data=data,
+                HTTP_X_FORWARDED_FOR=f'10.0.0.{idx}',
+            )
+            assert response.status_code == HTTPStatus.TOO_MANY_REQUESTS
+        for username in ('first', 'second'):
+            response = client.post(self.url_token, data={
+                'username': username, 'confirmation_code': 'wrong'
+            })
+            assert response.status_code == HTTPStatus.NOT_FOUND, (
+                'Проверьте, что запрос, отклонённый ограничением по '
+                '`username`, не расходует лимит IP-адреса.'
+            )
+        response = client.post(
+            self.url_token,
+            data={'username': 'third', 'confirmation_code': 'wrong'},
+            HTTP_X_FORWARDED_FOR='10.0.0.99',
+        )
+        assert response.status_code == HTTPStatus.TOO_MANY_REQUESTS, (
+            'Проверьте, что ограничение по IP нельзя обойти, подменяя '
+            'заголовок `X-Forwarded-For`.'
+        )
+
+    def test_signup_rejects_non_object_body(self, client):
+        response = client.post(
+            self.url_signup, data='[1, 2]', content_type='application/json'
+        )
+        assert response.status_code == HTTPStatus.BAD_REQUEST, (
+            f'Проверьте, что POST-запрос к `{self.url_signup}` со списком '
+            'вместо объекта возвращает ответ со статусом 400.'
+        )
+
+    def test_throttle_bucket_survives_concurrent_requests(self, monkeypatch):
+        from threading import Barrier, Thread
+        from time import sleep
+
+        from django.core.cache.backends.locmem import LocMemCache
+        from rest_framework.request import Request
+        from rest_framework.test import APIRequestFactory
+
+        from api.v1.throttling import SignupIPThrottle, TokenBucketThrottle
+
+        monkeypatch.setitem(
+            TokenBucketThrottle.THROTTLE_RATES, 'signup_ip', '3/hour'
+        )
+        get_many = LocMemCache.get_many
+
+        def slow_get_many(cache, keys):
+            # Растягиваем чтение-запись ведра, чтобы запросы пересеклись.
+            values = get_many(cache, keys)
+            sleep(0.02)
+            return values
+
+        monkeypatch.setattr(LocMemCache, 'get_many', slow_get_many)
+        request = Request(APIRequestFactory().post(self.url_signup))
+        barrier = Barrier(10)
+        allowed = []
+
+        def hit():
+            barrier.wait()
+            if SignupIPThrottle().allow_request(request, None):
+                allowed.append(True)
+
+        threads = [Thread(target=hit) for _ in range(10)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        assert 0 < len(allowed) <= 3, (
+            'Проверьте, что параллельные запросы не расходуют один и тот же '
+            'токен ведра.'
+        )
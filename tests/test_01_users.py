@@ -2,7 +2,8 @@ from http import HTTPStatus
 
 import pytest
 from tests.utils import (
-    check_pagination, invalid_data_for_user_patch_and_creation,
+    check_pagination, create_single_comment, create_titles,
+    invalid_data_for_user_patch_and_creation,
 )
 
 
@@ -552,3 +553,251 @@ class Test01UserAPI:
             'Проверьте, что PATCH-запрос к `/api/v1/users/me/` с ключом '
             '`role` не изменяет роль пользователя.'
         )
+
+    def test_11_users_reviews_and_comments(self, client, admin_client,
+                                           user_client, user, moderator,
+                                           django_assert_max_num_queries):
+        from reviews.models import Comment, Review
+
+        titles, _, _ = create_titles(admin_client)
+        reviews = [
+            Review.objects.create(
+                author=user, title_id=title['id'], text='t', score=5
+            ).id
+            for title in titles
+        ]
+        Review.objects.create(
+            author=moderator, title_id=titles[0]['id'], text='t', score=5
+        )
+        comments = [
+            create_single_comment(
+                user_client, title['id'], review_id, 'c'
+            ).json()['id']
+            for title, review_id in zip(titles, reviews)
+        ]
+
+        url = '/api/v1/users/me/reviews/'
+        assert client.get(url).status_code == HTTPStatus.UNAUTHORIZED
+        with django_assert_max_num_queries(2):
+            response = user_client.get(url)
+        assert response.status_code == HTTPStatus.OK, (
+            f'Проверьте, что GET-запрос пользователя к `{url}` возвращает '
+            'ответ со статусом 200.'
+        )
+        data = response.json()
+        assert 'count' not in data and [
+            review['id'] for review in data['results']
+        ] == reviews[::-1], (
+            f'Проверьте, что `{url}` возвращает отзывы текущего '
+            'пользователя от новых к старым с курсорной пагинацией.'
+        )
+
+        url = f'/api/v1/users/{user.username}/reviews/'
+        response = client.get(url)
+        assert response.status_code == HTTPStatus.OK
+        assert [
+            review['id'] for review in response.json()['results']
+        ] == reviews[::-1]
+
+        url = f'/api/v1/users/{user.username}/comments/'
+        response = client.get(url)
+        assert response.status_code == HTTPStatus.OK
+        assert [
+            comment['id'] for comment in response.json()['results']
+        ] == comments[::-1], (
+            f'Проверьте, что `{url}` возвращает комментарии пользователя.'
+        )
+        response = user_client.get('/api/v1/users/me/comments/')
+        assert len(response.json()['results']) == len(comments)
+        assert client.get(
+            '/api/v1/users/nobody/reviews/'
+        ).status_code == HTTPStatus.NOT_FOUND
+
+        plan = Review.objects.filter(author=user).order_by(
+            '-pub_date', '-id'
+        ).explain()
+        assert 'review_author_pub_date_idx' in plan
+        plan = Comment.objects.filter(author=user).order_by(
+            '-pub_date', '-id'
+        ).explain()
+        assert 'comment_author_pub_date_idx' in plan, (
+            'Проверьте, что для комментариев создан составной индекс '
+            '`(author_id, pub_date)`.'
+        )
+
+    def test_12_auth_user_snapshot(self, admin_client, user_client, user,
+                                   django_user_model,
+                                   django_assert_num_queries):
+        url = '/api/v1/genres/'
+        etag = admin_client.get(url)['ETag']
+        with django_assert_num_queries(0):
+            response = admin_client.get(url, HTTP_IF_NONE_MATCH=etag)
+        assert response.status_code == HTTPStatus.NOT_MODIFIED, (
+            'Проверьте, что аутентификация по JWT не загружает '
+            'пользователя из БД на каждый запрос.'
+        )
+        assert user_client.post(url, data={
+            'name': 'Драма', 'slug': 'drama'
+        }).status_code == HTTPStatus.FORBIDDEN
+
+        response = admin_client.patch(
+            f'/api/v1/users/{user.username}/', data={'role': 'admin'}
+        )
+        assert response.status_code == HTTPStatus.OK
+        assert user_client.post(url, data={
+            'name': 'Драма', 'slug': 'drama'
+        }).status_code == HTTPStatus.CREATED, (
+            'Проверьте, что смена роли через `/api/v1/users/{username}/` '
+            'сразу сбрасывает сохранённые данные аутентификации.'
+        )
+
+        # Блокировка в другом процессе: меняется только метка в общем
+        # кэше, снимок в памяти этого процесса остаётся прежним.
+        from api.v1.authentication import bump_stamps
+
+        django_user_model.objects.filter(pk=user.pk).update(is_active=False)
+        bump_stamps((user.pk,))
+        assert user_client.get(url).status_code == HTTPStatus.UNAUTHORIZED, (
+            'Проверьте, что блокировку пользователя видят все процессы.'
+        )
+
+        response = admin_client.get('/api/v1/users/me/')
+        assert response.json()['email'] == 'testadmin@yamdb.fake'
+
+    def test_13_users_bulk_update(self, admin_client, user_client, user,
+                                  moderator, django_user_model,
+                                  django_assert_max_num_queries):
+        url = '/api/v1/users/bulk-update/'
+        data = {
+            'usernames': [user.username, 'nobody', moderator.username],
+            'role': 'admin',
+        }
+        genre = {'name': 'Драма', 'slug': 'drama'}
+        assert user_client.post(
+            '/api/v1/genres/', data=genre
+        ).status_code == HTTPStatus.FORBIDDEN
+        response = user_client.post(url, data=data, format='json')
+        assert response.status_code == HTTPStatus.FORBIDDEN, (
+            f'Проверьте, что `{url}` доступен только администратору.'
+        )
+
+        with django_assert_max_num_queries(4):
+            response = admin_client.post(url, data=data, format='json')
+        assert response.status_code == HTTPStatus.OK, (
+            f'Проверьте, что POST-запрос администратора к `{url}` '
+            'возвращает ответ со статусом 200.'
+        )
+        assert response.json() == [
+            {'username': user.username, 'status': 'updated'},
+            {'username': 'nobody', 'status': 'not_found'},
+            {'username': moderator.username, 'status': 'updated'},
+        ], (
+            f'Проверьте, что `{url}` возвращает результат для каждого '
+            'пользователя из запроса.'
+        )
+        assert set(django_user_model.objects.filter(
+            username__in=data['usernames']
+        ).values_list('role', flat=True)) == {'admin'}
+        assert user_client.post(
+            '/api/v1/genres/', data=genre
+        ).status_code == HTTPStatus.CREATED, (
+            f'Проверьте, что `{url}` сбрасывает сохранённые данные '
+            'аутентификации изменённых пользователей.'
+        )
+
+        response = admin_client.post(
+            url, data={'usernames': [user.username]}, format='json'
+        )
+        assert response.status_code == HTTPStatus.BAD_REQUEST
+        response = admin_client.post(
+            url, data={'usernames': [user.username], 'role': 'king'},
+            format='json',
+        )
+        assert response.status_code == HTTPStatus.BAD_REQUEST
+
+    def test_14_users_prefix_and_substring_search(self, admin_client,
+                                                  django_user_model):
+        from django.db import connection
+
+        from reviews.search import USER_SEARCH_TABLE
+
+        for username, email in (('alice', 'alice@mail.fake'),
+                                ('malice', 'm@corp.fake'),
+                                ('bob', 'bob@alice.fake'),
+                                ('Alina', 'alina@mail.fake')):
+            django_user_model.objects.create_user(
+                username=username, email=email
+            )
+        url = '/api/v1/users/'
+
+        def usernames(query):
+            response = admin_client.get(f'{url}?search={query}')
+            assert response.status_code == HTTPStatus.OK
+            return sorted(user['username'] for user in response.json()[
+                'results'
+            ])
+
+        assert usernames('^ali') == ['alice'], (
+            'Проверьте, что `?search=^{prefix}` ищет пользователей по '
+            'началу username.'
+        )
+        assert usernames('alic') == ['alice', 'bob', 'malice'], (
+            'Проверьте, что `?search={text}` ищет подстроку в username '
+            'и email.'
+        )
+        assert usernames('ALI') == ['Alina', 'alice', 'bob', 'malice']
+        assert usernames('ob') == ['bob']
+
+        user = django_user_model.objects.get(username='bob')
+        user.email = 'bob@mail.fake'
+        user.save()
+        assert usernames('alic') == ['alice', 'malice'], (
+            'Проверьте, что индекс поиска обновляется при изменении '
+            'пользователя.'
+        )
+
+        plan = django_user_model.objects.filter(
+            username__gte='ali', username__lt='ali\U0010ffff'
+        ).explain()
+        assert 'INDEX' in plan.upper()
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f'SELECT count(*) FROM {USER_SEARCH_TABLE} '
+                f'WHERE {USER_SEARCH_TABLE} MATCH %s', ('"alic"',)
+            )
+            assert cursor.fetchone()[0] == 2
+
+    def test_15_auth_snapshot_with_project_cache(self, admin_client,
+                                                 django_assert_num_queries):
+        from django.core.cache import caches
+        from django.test import override_settings
+
+        from api.v1.authentication import user_snapshots
+        from api_yamdb import settings as project_settings
+
+        backend = project_settings.CACHES['default']['BACKEND']
+        assert not backend.endswith('DatabaseCache'), (
+            'Проверьте, что метки снимков пользователей хранятся не в БД: '
+            'иначе каждый запрос по-прежнему обращается к базе данных.'
+        )
+        pytest.importorskip('pymemcache')
+        url = '/api/v1/genres/'
+        with override_settings(CACHES=project_settings.CACHES):
+            shared = caches['default']
+            shared.set('api:v1:probe', 1)
+            if shared.get('api:v1:probe') != 1:
+                pytest.skip('memcached из настроек проекта недоступен')
+            try:
+                shared.clear()
+                user_snapshots.clear()
+                etag = admin_client.get(url)['ETag']
+                with django_assert_num_queries(0):
+                    response = admin_client.get(
+                        url, HTTP_IF_NONE_MATCH=etag
+                    )
+                assert response.status_code == HTTPStatus.NOT_MODIFIED, (
+                    'Проверьте, что с кэшем из настроек проекта '
+                    'аутентифицированный запрос не обращается к БД.'
+                )
+            finally:
+                shared.clear()
@@ -1,3 +1,4 @@
+import json
 from http import HTTPStatus
 
 import pytest
@@ -317,3 +318,252 @@ class Test04TitleAPI:
                           HTTPStatus.FORBIDDEN)
         check_permissions(moderator_client, url, data, 'модератора',
                           titles, HTTPStatus.FORBIDDEN)
+
+    def test_06_titles_cursor_pagination(self, client, admin_client,
+                                         django_assert_max_num_queries):
+        titles, categories, genres = create_titles(admin_client)
+        for idx in range(11):
+            admin_client.post('/api/v1/titles/', data={
+                'name': f'Произведение {idx}',
+                'year': 1984,
+                'genre': [genres[idx % 2]['slug']],
+                'category': categories[0]['slug'],
+            })
+        url = '/api/v1/titles/?cursor='
+        response = client.get(url)
+        assert response.status_code == HTTPStatus.OK
+        data = response.json()
+        assert 'count' not in data and 'next' in data, (
+            f'Проверьте, что GET-запрос к `{url}` использует курсорную '
+            'пагинацию без подсчёта общего количества объектов.'
+        )
+
+        seen = [title['id'] for title in data['results']]
+        with django_assert_max_num_queries(3):
+            response = client.get(data['next'])
+        data = response.json()
+        seen.extend(title['id'] for title in data['results'])
+        assert data['next'] is None and data['previous'], (
+            f'Проверьте, что ссылки `next` и `previous` ответа на запрос к '
+            f'`{url}` указывают на соседние страницы.'
+        )
+        assert len(seen) == len(set(seen)) == len(titles) + 11, (
+            f'Проверьте, что курсорная пагинация `{url}` обходит все '
+            'произведения без пропусков и повторов.'
+        )
+        years = [
+            title['year'] for title in
+            client.get(data['previous']).json()['results']
+        ]
+        assert years == sorted(years, reverse=True)
+
+        response = client.get(f'{url}&genre={genres[0]["slug"]}')
+        assert len(response.json()['results']) == 7, (
+            f'Проверьте, что курсорная пагинация `{url}` учитывает фильтры.'
+        )
+        response = client.get('/api/v1/titles/?cursor=broken')
+        assert response.status_code == HTTPStatus.NOT_FOUND
+
+    def test_07_titles_search(self, client, admin_client):
+        titles, _, _ = create_titles(admin_client)
+        url = '/api/v1/titles/'
+        admin_client.patch(f'{url}{titles[1]["id"]}/', data={
+            'description': 'Терминатор здесь не при чём.'
+        })
+
+        response = client.get(f'{url}?search=терминатор')
+        assert response.status_code == HTTPStatus.OK
+        found = [title['id'] for title in response.json()['results']]
+        assert found == [titles[0]['id'], titles[1]['id']], (
+            f'Проверьте, что параметр `search` эндпоинта `{url}` ищет по '
+            'названию и описанию и ставит выше совпадения в названии.'
+        )
+
+        response = client.get(f'{url}?search=крепк')
+        found = [title['id'] for title in response.json()['results']]
+        assert found == [titles[1]['id']], (
+            f'Проверьте, что параметр `search` эндпоинта `{url}` находит '
+            'произведения по началу слова.'
+        )
+
+        admin_client.delete(f'{url}{titles[1]["id"]}/')
+        response = client.get(f'{url}?search=терминатор')
+        assert len(response.json()['results']) == 1, (
+            f'Проверьте, что удалённые произведения не находятся через '
+            f'параметр `search` эндпоинта `{url}`.'
+        )
+        response = client.get(f'{url}?search="*')
+        assert response.json()['results'] == []
+
+    def test_08_titles_multiple_genres(self, client, admin_client):
+        titles, _, genres = create_titles(admin_client)
+        url = '/api/v1/titles/'
+        horror, comedy, drama = (genre['slug'] for genre in genres)
+
+        response = client.get(f'{url}?genre={horror},{drama}')
+        assert len(response.json()['results']) == 2, (
+            f'Проверьте, что фильтр `genre` эндпоинта `{url}` по '
+            'нескольким жанрам через запятую находит произведения '
+            'хотя бы с одним из жанров.'
+        )
+        response = client.get(f'{url}?genre={horror},{comedy}&genre_match=all')
+        assert [title['id'] for title in response.json()['results']] == [
+            titles[0]['id']
+        ], (
+            f'Проверьте, что фильтр `genre` эндпоинта `{url}` с '
+            '`genre_match=all` находит произведения со всеми жанрами.'
+        )
+        response = client.get(f'{url}?genre={horror},{drama}&genre_match=all')
+        assert response.json()['results'] == []
+
+        admin_client.patch(f'{url}{titles[1]["id"]}/', data={
+            'genre': [horror, drama]
+        })
+        response = client.get(f'{url}?genre={horror},{drama}&genre_match=all')
+        assert [title['id'] for title in response.json()['results']] == [
+            titles[1]['id']
+        ], (
+            f'Проверьте, что фильтр `genre` эндпоинта `{url}` учитывает '
+            'изменение жанров произведения.'
+        )
+
+    def test_08_01_titles_genre_index(self, client, admin_client,
+                                      monkeypatch):
+        from api.v1 import filters
+        from api.v1.genre_index import GenreIndex
+
+        titles, _, genres = create_titles(admin_client)
+        url = '/api/v1/titles/'
+        horror, comedy, drama = (genre['slug'] for genre in genres)
+        builds = []
+        build = GenreIndex.build
+        monkeypatch.setattr(
+            GenreIndex, 'build',
+            staticmethod(lambda: builds.append(1) or build()),
+        )
+        client.get(f'{url}?genre={horror}')
+        admin_client.patch(f'{url}{titles[0]["id"]}/', data={'name': 'Новое'})
+        client.get(f'{url}?genre={comedy}')
+        assert len(builds) == 1, (
+            'Проверьте, что переименование произведения не перестраивает '
+            'индекс жанров.'
+        )
+
+        monkeypatch.setattr(filters, 'GENRE_INDEX_MAX_IDS', 0)
+        response = client.get(f'{url}?genre={horror},{drama}')
+        assert len(response.json()['results']) == 2, (
+            'Проверьте, что при большом числе id фильтр `genre` '
+            'переходит на подзапрос и находит те же произведения.'
+        )
+        response = client.get(f'{url}?genre={horror},{comedy}&genre_match=all')
+        assert [title['id'] for title in response.json()['results']] == [
+            titles[0]['id']
+        ]
+
+    def test_09_titles_sparse_fieldsets(self, client, admin_client,
+                                        django_assert_max_num_queries):
+        titles, _, _ = create_titles(admin_client)
+        url = '/api/v1/titles/'
+
+        with django_assert_max_num_queries(2):
+            response = client.get(f'{url}?fields=id,name,year,rating')
+        assert set(response.json()['results'][0]) == {
+            'id', 'name', 'year', 'rating'
+        }, (
+            f'Проверьте, что параметр `fields` эндпоинта `{url}` '
+            'ограничивает набор полей в ответе.'
+        )
+
+        with django_assert_max_num_queries(2):
+            response = client.get(f'{url}?omit=genre,description')
+        title = response.json()['results'][0]
+        assert 'genre' not in title and 'description' not in title, (
+            f'Проверьте, что параметр `omit` эндпоинта `{url}` убирает '
+            'поля из ответа.'
+        )
+        assert title['category'], (
+            f'Проверьте, что параметр `omit` эндпоинта `{url}` не убирает '
+            'незатронутые поля.'
+        )
+
+        response = client.get(f'{url}{titles[0]["id"]}/?fields=genre')
+        assert set(response.json()) == {'genre'}, (
+            f'Проверьте, что параметр `fields` эндпоинта `{url}{{title_id}}/` '
+            'ограничивает набор полей в ответе.'
+        )
+
+    def test_10_titles_bulk_create(self, client, admin_client, user_client,
+                                   django_assert_max_num_queries):
+        genres = create_genre(admin_client)
+        categories = create_categories(admin_client)
+        url = '/api/v1/titles/bulk/'
+        data = [
+            {
+                'name': f'Сериал {idx}',
+                'year': 2000 + idx,
+                'genre': [genres[0]['slug'], genres[idx % 3]['slug']],
+                'category': categories[idx % 2]['slug'],
+            }
+            for idx in range(20)
+        ]
+        response = user_client.post(url, data=data, format='json')
+        assert response.status_code == HTTPStatus.FORBIDDEN
+
+        invalid = data[:2] + [{**data[2], 'genre': ['missing']}]
+        response = admin_client.post(url, data=invalid, format='json')
+        assert response.status_code == HTTPStatus.BAD_REQUEST, (
+            f'Проверьте, что POST-запрос администратора к `{url}` с '
+            'некорректными элементами возвращает ответ со статусом 400.'
+        )
+        errors = response.json()
+        assert errors[:2] == [{}, {}] and 'genre' in errors[2], (
+            f'Проверьте, что POST-запрос к `{url}` возвращает ошибки '
+            'для каждого элемента пакета.'
+        )
+        assert client.get('/api/v1/titles/').json()['count'] == 0
+
+        with django_assert_max_num_queries(10):
+            response = admin_client.post(url, data=data, format='json')
+        assert response.status_code == HTTPStatus.CREATED, (
+            f'Если POST-запрос администратора к `{url}` содержит '
+            'корректные данные - должен вернуться ответ со статусом 201.'
+        )
+        created = response.json()
+        assert len(created) == len(data)
+        title = client.get(f'/api/v1/titles/{created[5]["id"]}/').json()
+        assert title['name'] == data[5]['name'] and [
+            genre['slug'] for genre in title['genre']
+        ] == sorted({genres[0]['slug'], genres[2]['slug']}), (
+            f'Проверьте, что POST-запрос к `{url}` сохраняет жанры '
+            'созданных произведений.'
+        )
+        response = client.get(f'/api/v1/titles/?search={data[7]["name"]}')
+        assert created[7]['id'] in [
+            title['id'] for title in response.json()['results']
+        ]
+
+    def test_11_titles_export(self, client, user_client, admin_client,
+                              django_assert_max_num_queries):
+        titles, categories, genres = create_titles(admin_client)
+        url = '/api/v1/titles/export/'
+        assert client.get(url).status_code == HTTPStatus.UNAUTHORIZED
+        assert user_client.get(url).status_code == HTTPStatus.FORBIDDEN
+
+        with django_assert_max_num_queries(3):
+            response = admin_client.get(url)
+            lines = b''.join(response.streaming_content).splitlines()
+        assert response.status_code == HTTPStatus.OK, (
+            f'Проверьте, что GET-запрос администратора к `{url}` '
+            'возвращает ответ со статусом 200.'
+        )
+        assert response['Content-Type'] == 'application/x-ndjson'
+        exported = [json.loads(line) for line in lines]
+        assert [title['id'] for title in exported] == [
+            title['id'] for title in titles
+        ], (
+            f'Проверьте, что GET-запрос к `{url}` выгружает все '
+            'произведения по одному в строке.'
+        )
+        assert exported[0]['category'] == categories[0]
+        assert exported[0]['genre'] == [genres[1], genres[0]]
+        assert 'rating' in exported[0]
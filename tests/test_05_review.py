@@ -386,3 +386,227 @@ class Test05ReviewAPI:
                 f'Проверьте, что DELETE-запрос {role} к чужому отзыву через '
                 f'`{url_template}` удаляет отзыв.'
             )
+
+    def test_06_reviews_sparse_fieldsets(self, client, admin_client, admin,
+                                         user, user_client):
+        author_map = {
+            admin: admin_client,
+            user: user_client,
+        }
+        reviews, titles = create_reviews(admin_client, author_map)
+        url = f'/api/v1/titles/{titles[0]["id"]}/reviews/'
+
+        response = client.get(f'{url}?fields=id,score')
+        assert response.status_code == HTTPStatus.OK
+        for review in response.json()['results']:
+            assert set(review) == {'id', 'score'}, (
+                'Проверьте, что параметр `fields` эндпоинта '
+                '`/api/v1/titles/{title_id}/reviews/` ограничивает набор '
+                'полей в ответе.'
+            )
+        response = client.get(f'{url}{reviews[0]["id"]}/?omit=text,title')
+        assert set(response.json()) == {
+            'id', 'author', 'score', 'pub_date', 'comment_count'
+        }
+
+    def test_07_review_duplicate_and_upsert(self, client, admin_client,
+                                            user_client):
+        titles, _, _ = create_titles(admin_client)
+        url = f'/api/v1/titles/{titles[0]["id"]}/reviews/'
+        review = create_single_review(
+            user_client, titles[0]['id'], 'first', 2
+        ).json()
+
+        response = user_client.post(url, data={'text': 'again', 'score': 9})
+        assert response.status_code == HTTPStatus.BAD_REQUEST, (
+            f'Проверьте, что повторный POST-запрос пользователя к `{url}` '
+            'возвращает ответ со статусом 400.'
+        )
+        assert 'non_field_errors' in response.json()
+
+        response = user_client.post(
+            f'{url}?upsert=true', data={'text': 'again', 'score': 9}
+        )
+        assert response.status_code == HTTPStatus.OK, (
+            f'Проверьте, что POST-запрос к `{url}?upsert=true` заменяет '
+            'отзыв пользователя и возвращает ответ со статусом 200.'
+        )
+        assert response.json()['id'] == review['id']
+        assert response.json()['text'] == 'again'
+        assert client.get(url).json()['count'] == 1
+        title = client.get(f'/api/v1/titles/{titles[0]["id"]}/').json()
+        assert title['rating'] == 9, (
+            'Проверьте, что замена отзыва через `upsert` пересчитывает '
+            'рейтинг произведения.'
+        )
+
+        response = user_client.post(
+            f'/api/v1/titles/{titles[1]["id"]}/reviews/?upsert=true',
+            data={'text': 'new', 'score': 4}
+        )
+        assert response.status_code == HTTPStatus.CREATED
+
+    def test_07_01_review_conflict_without_existing_review(
+            self, admin_client, user_client, monkeypatch):
+        from reviews.models import Review
+
+        titles, _, _ = create_titles(admin_client)
+
+        def conflicting_save(*args, **kwargs):
+            raise IntegrityError('concurrent delete')
+
+        monkeypatch.setattr(Review, 'save', conflicting_save)
+        response = user_client.post(
+            f'/api/v1/titles/{titles[0]["id"]}/reviews/?upsert=true',
+            data={'text': 'text', 'score': 4},
+        )
+        assert response.status_code == HTTPStatus.BAD_REQUEST, (
+            'Проверьте, что ошибка целостности без существующего отзыва '
+            'автора возвращает ответ со статусом 400.'
+        )
+
+    def test_08_reviews_cursor_pagination(self, client, admin_client,
+                                          django_user_model):
+        from reviews.models import Review
+
+        titles, _, _ = create_titles(admin_client)
+        authors = [
+            django_user_model.objects.create_user(
+                username=f'author{idx}', email=f'author{idx}@yamdb.fake'
+            )
+            for idx in range(12)
+        ]
+        created = [
+            Review.objects.create(
+                author=author, title_id=titles[0]['id'], text='t', score=5
+            ).id
+            for author in authors
+        ]
+        url = f'/api/v1/titles/{titles[0]["id"]}/reviews/'
+
+        data = client.get(f'{url}?cursor=').json()
+        seen = [review['id'] for review in data['results']]
+        data = client.get(data['next']).json()
+        seen.extend(review['id'] for review in data['results'])
+        assert seen == created[::-1] and data['next'] is None, (
+            f'Проверьте, что курсорная пагинация `{url}` отдаёт '
+            'отзывы от новых к старым без пропусков и повторов.'
+        )
+        data = client.get(data['previous']).json()
+        assert [review['id'] for review in data['results']] == seen[:10]
+
+        plan = Review.objects.filter(
+            title_id=titles[0]['id']
+        ).order_by('-pub_date', '-id').explain()
+        assert 'review_title_pub_date_idx' in plan, (
+            'Проверьте, что для отзывов создан составной индекс '
+            '`(title_id, pub_date)`.'
+        )
+
+    def test_09_reviews_bulk_create(self, client, admin_client, user_client,
+                                    user, moderator, admin,
+                                    django_assert_max_num_queries):
+        titles, _, _ = create_titles(admin_client)
+        create_single_review(user_client, titles[1]['id'], 'text', 2)
+        url = '/api/v1/reviews/bulk/'
+        data = [
+            {
+                'author': author.username,
+                'title': title['id'],
+                'text': 'Отзыв партнёра',
+                'score': score,
+            }
+            for author, score in ((moderator, 4), (admin, 9))
+            for title in titles
+        ]
+        response = user_client.post(url, data=data, format='json')
+        assert response.status_code == HTTPStatus.FORBIDDEN
+
+        invalid = data + [
+            {**data[0], 'score': 5},
+            {**data[0], 'author': user.username, 'title': titles[1]['id']},
+            {**data[0], 'author': 'nobody'},
+        ]
+        response = admin_client.post(url, data=invalid, format='json')
+        assert response.status_code == HTTPStatus.BAD_REQUEST, (
+            f'Проверьте, что POST-запрос администратора к `{url}` с '
+            'повторяющимися отзывами возвращает ответ со статусом 400.'
+        )
+        errors = response.json()
+        assert errors[:len(data)] == [{}] * len(data), (
+            f'Проверьте, что POST-запрос к `{url}` возвращает ошибки '
+            'для каждого элемента пакета.'
+        )
+        assert 'non_field_errors' in errors[-3], (
+            'Проверьте, что повтор пары (автор, произведение) внутри '
+            'пакета отклоняется.'
+        )
+        assert 'non_field_errors' in errors[-2], (
+            'Проверьте, что отзыв, который уже есть в базе, отклоняется.'
+        )
+        assert 'author' in errors[-1]
+
+        with django_assert_max_num_queries(10):
+            response = admin_client.post(url, data=data, format='json')
+        assert response.status_code == HTTPStatus.CREATED, (
+            f'Если POST-запрос администратора к `{url}` содержит '
+            'корректные данные - должен вернуться ответ со статусом 201.'
+        )
+        created = response.json()
+        assert len(created) == len(data) and all(
+            review['id'] for review in created
+        )
+        title = client.get(f'/api/v1/titles/{titles[1]["id"]}/').json()
+        assert title['rating'] == 5, (
+            f'Проверьте, что POST-запрос к `{url}` пересчитывает рейтинг '
+            'затронутых произведений.'
+        )
+        response = client.get(
+            f'/api/v1/titles/{titles[0]["id"]}/reviews/{created[0]["id"]}/'
+        )
+        assert response.json()['author'] == moderator.username
+
+    def test_10_reviews_include_comments(self, client, admin_client, admin,
+                                         user, moderator,
+                                         django_assert_max_num_queries):
+        from reviews.models import Comment, Review
+
+        titles, _, _ = create_titles(admin_client)
+        reviews = [
+            Review.objects.create(
+                author=author, title_id=titles[0]['id'], text='t', score=5
+            )
+            for author in (admin, user, moderator)
+        ]
+        comments = {
+            review.id: [
+                Comment.objects.create(
+                    author=user, review=review, text=f'c{idx}'
+                ).id
+                for idx in range(count)
+            ]
+            for review, count in zip(reviews, (5, 1, 0))
+        }
+        url = f'/api/v1/titles/{titles[0]["id"]}/reviews/'
+
+        with django_assert_max_num_queries(4):
+            response = client.get(f'{url}?include=comments&comments_limit=2')
+        assert response.status_code == HTTPStatus.OK
+        results = response.json()['results']
+        for review in results:
+            assert [
+                comment['id'] for comment in review['comments']
+            ] == comments[review['id']][::-1][:2], (
+                f'Проверьте, что `{url}?include=comments&comments_limit=N` '
+                'возвращает N последних комментариев каждого отзыва.'
+            )
+        assert results[-1]['comments'][0]['author'] == user.username
+
+        response = client.get(f'{url}{reviews[0].id}/?include=comments')
+        assert len(response.json()['comments']) == 3, (
+            'Проверьте, что по умолчанию к отзыву добавляются три '
+            'последних комментария.'
+        )
+        assert 'comments' not in client.get(url).json()['results'][0]
+        response = client.get(f'{url}?include=comments&comments_limit=0')
+        assert response.status_code == HTTPStatus.BAD_REQUEST
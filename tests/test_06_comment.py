@@ -382,3 +382,115 @@ class Test06CommentAPI:
             'Проверьте, что DELETE-запрос неавторизованного пользователя к '
             f'`{url}` возвращает ответ со статусом 401.'
         )
+
+    def test_07_comments_cursor_pagination(self, client, admin_client, admin,
+                                           user_client, user):
+        author_map = {
+            admin: admin_client,
+            user: user_client,
+        }
+        reviews, titles = create_reviews(admin_client, author_map)
+        url = (
+            f'/api/v1/titles/{titles[0]["id"]}/reviews/'
+            f'{reviews[0]["id"]}/comments/'
+        )
+        created = [
+            create_single_comment(
+                user_client, titles[0]['id'], reviews[0]['id'], f'c{idx}'
+            ).json()['id']
+            for idx in range(12)
+        ]
+
+        data = client.get(f'{url}?cursor=').json()
+        assert 'count' not in data, (
+            f'Проверьте, что GET-запрос к `{url}?cursor=` использует '
+            'курсорную пагинацию без подсчёта количества объектов.'
+        )
+        seen = [comment['id'] for comment in data['results']]
+        data = client.get(data['next']).json()
+        seen.extend(comment['id'] for comment in data['results'])
+        assert seen == created[::-1] and data['next'] is None, (
+            f'Проверьте, что курсорная пагинация `{url}` отдаёт '
+            'комментарии от новых к старым без пропусков и повторов.'
+        )
+
+    def test_08_review_comment_count(self, client, admin_client, admin,
+                                     user_client, user):
+        author_map = {
+            admin: admin_client,
+            user: user_client,
+        }
+        reviews, titles = create_reviews(admin_client, author_map)
+        url = f'/api/v1/titles/{titles[0]["id"]}/reviews/'
+        comment_ids = [
+            create_single_comment(
+                user_client, titles[0]['id'], reviews[1]['id'], f'c{idx}'
+            ).json()['id']
+            for idx in range(3)
+        ]
+        create_single_comment(
+            user_client, titles[0]['id'], reviews[0]['id'], 'other'
+        )
+        user_client.delete(
+            f'{url}{reviews[1]["id"]}/comments/{comment_ids[0]}/'
+        )
+
+        response = client.get(f'{url}?ordering=-comment_count')
+        assert response.status_code == HTTPStatus.OK
+        counts = [
+            (review['id'], review['comment_count'])
+            for review in response.json()['results']
+        ]
+        assert counts == [(reviews[1]['id'], 2), (reviews[0]['id'], 1)], (
+            f'Проверьте, что ответ на GET-запрос к `{url}` содержит '
+            'количество комментариев к отзыву и поддерживает сортировку '
+            '`ordering=-comment_count`.'
+        )
+
+    def test_09_comment_count_ordering_is_stable(self, client, admin_client,
+                                                 django_user_model):
+        from reviews.models import Comment, Review
+        from tests.utils import create_titles
+
+        titles, _, _ = create_titles(admin_client)
+        reviews = [
+            Review.objects.create(
+                author=django_user_model.objects.create_user(
+                    username=f'author{idx}', email=f'author{idx}@yamdb.fake'
+                ),
+                title_id=titles[0]['id'], text='t', score=5,
+            )
+            for idx in range(12)
+        ]
+        Comment.objects.create(
+            author=reviews[0].author, review=reviews[0], text='c'
+        )
+        url = (
+            f'/api/v1/titles/{titles[0]["id"]}/reviews/'
+            '?ordering=-comment_count'
+        )
+        expected = [reviews[0].id] + [review.id for review in reviews[:0:-1]]
+
+        data = client.get(url).json()
+        seen = [review['id'] for review in data['results']]
+        seen += [
+            review['id'] for review in client.get(data['next']).json()[
+                'results'
+            ]
+        ]
+        assert seen == expected, (
+            'Проверьте, что при сортировке `ordering=-comment_count` '
+            'отзывы с равным числом комментариев упорядочены по дате.'
+        )
+
+        data = client.get(f'{url}&cursor=').json()
+        seen = [review['id'] for review in data['results']]
+        seen += [
+            review['id'] for review in client.get(data['next']).json()[
+                'results'
+            ]
+        ]
+        assert seen == expected, (
+            'Проверьте, что курсорная пагинация учитывает параметр '
+            '`ordering`.'
+        )
@@ -0,0 +1,178 @@
+from http import HTTPStatus
+
+import pytest
+from tests.utils import create_single_review, create_titles
+
+from django.core.management import call_command
+
+
+@pytest.mark.django_db(transaction=True)
+class Test08RatingAPI:
+
+    def get_rating(self, client, title_id):
+        response = client.get(f'/api/v1/titles/{title_id}/')
+        assert response.status_code == HTTPStatus.OK
+        return response.json().get('rating')
+
+    def test_01_rating_follows_review_changes(self, client, admin_client,
+                                              user_client, moderator_client,
+                                              moderator):
+        titles, _, _ = create_titles(admin_client)
+        title_id = titles[0]['id']
+        url = f'/api/v1/titles/{title_id}/reviews/'
+
+        review = create_single_review(user_client, title_id, 'text', 3).json()
+        create_single_review(moderator_client, title_id, 'text', 8)
+        assert self.get_rating(client, title_id) == 5, (
+            'Проверьте, что рейтинг произведения пересчитывается при '
+            'создании отзыва.'
+        )
+
+        response = user_client.patch(
+            f'{url}{review["id"]}/', data={'score': 10}
+        )
+        assert response.status_code == HTTPStatus.OK
+        assert self.get_rating(client, title_id) == 9, (
+            'Проверьте, что рейтинг произведения пересчитывается при '
+            'изменении оценки в отзыве.'
+        )
+
+        response = user_client.delete(f'{url}{review["id"]}/')
+        assert response.status_code == HTTPStatus.NO_CONTENT
+        assert self.get_rating(client, title_id) == 8, (
+            'Проверьте, что рейтинг произведения пересчитывается при '
+            'удалении отзыва.'
+        )
+
+        moderator.delete()
+        assert self.get_rating(client, title_id) is None, (
+            'Проверьте, что рейтинг произведения пересчитывается при '
+            'каскадном удалении отзывов вместе с автором.'
+        )
+
+    def test_02_recalculate_ratings_command(self, client, admin_client,
+                                            user_client):
+        from reviews.models import Title
+
+        titles, _, _ = create_titles(admin_client)
+        title_id = titles[0]['id']
+        create_single_review(user_client, title_id, 'text', 7)
+        Title.objects.update(rating_sum=0, review_count=0, rating=None)
+
+        call_command('recalculate_ratings')
+        assert self.get_rating(client, title_id) == 7, (
+            'Проверьте, что команда `recalculate_ratings` восстанавливает '
+            'рейтинг произведений по отзывам.'
+        )
+        assert self.get_rating(client, titles[1]['id']) is None
+
+    def test_03_rating_distribution(self, client, admin_client, user_client,
+                                    moderator_client,
+                                    django_assert_max_num_queries):
+        from reviews.models import Title
+
+        titles, _, _ = create_titles(admin_client)
+        title_id = titles[0]['id']
+        url = f'/api/v1/titles/{title_id}/rating-distribution/'
+        review = create_single_review(user_client, title_id, 'text', 3).json()
+        create_single_review(moderator_client, title_id, 'text', 8)
+
+        with django_assert_max_num_queries(1):
+            response = client.get(url)
+        assert response.status_code == HTTPStatus.OK, (
+            'Проверьте, что `/api/v1/titles/{title_id}/rating-distribution/` '
+            'доступен без авторизации.'
+        )
+        data = response.json()
+        expected = {str(score): 0 for score in range(1, 11)}
+        expected.update({'3': 1, '8': 1})
+        assert data['distribution'] == expected, (
+            'Проверьте, что распределение оценок содержит число отзывов '
+            'для каждой оценки от 1 до 10.'
+        )
+        assert data['review_count'] == 2
+        assert data['rating'] == 5
+
+        user_client.patch(
+            f'/api/v1/titles/{title_id}/reviews/{review["id"]}/',
+            data={'score': 8},
+        )
+        distribution = client.get(url).json()['distribution']
+        assert distribution['3'] == 0 and distribution['8'] == 2, (
+            'Проверьте, что распределение оценок обновляется при изменении '
+            'оценки в отзыве.'
+        )
+
+        Title.objects.update(score_8_count=0)
+        call_command('recalculate_ratings')
+        assert client.get(url).json()['distribution']['8'] == 2, (
+            'Проверьте, что команда `recalculate_ratings` восстанавливает '
+            'распределение оценок.'
+        )
+
+        response = client.get('/api/v1/titles/0/rating-distribution/')
+        assert response.status_code == HTTPStatus.NOT_FOUND
+
+    def test_04_top_titles(self, client, admin_client, django_user_model,
+                           django_assert_max_num_queries):
+        from reviews.models import Review, Title
+
+        titles, _, _ = create_titles(admin_client)
+        weak_title = Title.objects.create(name='Проходной фильм', year=2001)
+        authors = [
+            django_user_model.objects.create_user(
+                username=f'critic{idx}', email=f'critic{idx}@yamdb.fake'
+            )
+            for idx in range(10)
+        ]
+        Review.objects.create(
+            author=authors[0], title_id=titles[0]['id'], text='t', score=10
+        )
+        for author in authors:
+            Review.objects.create(
+                author=author, title_id=titles[1]['id'], text='t', score=9
+            )
+            Review.objects.create(
+                author=author, title=weak_title, text='t', score=3
+            )
+        url = '/api/v1/titles/top/'
+        assert client.get(url).json()['results'] == [], (
+            f'Проверьте, что до запуска `rank_titles` `{url}` пуст.'
+        )
+
+        call_command('rank_titles', prior_weight=5)
+        with django_assert_max_num_queries(3):
+            response = client.get(url)
+        assert response.status_code == HTTPStatus.OK
+        results = response.json()['results']
+        assert [title['id'] for title in results] == [
+            titles[1]['id'], titles[0]['id'], weak_title.id
+        ], (
+            f'Проверьте, что `{url}` ставит произведение со многими '
+            'высокими оценками выше произведения с единственной десяткой.'
+        )
+        assert [title['position'] for title in results] == [1, 2, 3]
+        assert results[0]['weighted_rating'] > results[1]['weighted_rating']
+        assert results[0]['category'] and results[0]['genre']
+
+    def test_05_rating_accepts_string_scores(self, client, admin_client,
+                                             user):
+        from reviews.models import Review, Title
+
+        titles, _, _ = create_titles(admin_client)
+        title_id = titles[0]['id']
+        # Так создаёт отзывы import_csv: оценка из CSV приходит строкой.
+        review = Review.objects.create(
+            author=user, title_id=title_id, text='t', score='8'
+        )
+        assert self.get_rating(client, title_id) == 8, (
+            'Проверьте, что рейтинг учитывает отзыв, созданный с оценкой '
+            'в виде строки, как при загрузке `import_csv`.'
+        )
+        review.score = '4'
+        review.save()
+        review.delete()
+        title = Title.objects.get(pk=title_id)
+        assert (title.rating, title.review_count, title.score_8_count) == (
+            None, 0, 0
+        )
@@ -0,0 +1,144 @@
+import pytest
+from tests.utils import create_titles
+
+
+@pytest.mark.django_db(transaction=True)
+class Test09QueryBudget:
+
+    TITLE_LIST_QUERIES = 3
+    TITLE_DETAIL_QUERIES = 2
+
+    def create_many_titles(self, admin_client, count):
+        titles, categories, genres = create_titles(admin_client)
+        for idx in range(count - len(titles)):
+            admin_client.post('/api/v1/titles/', data={
+                'name': f'Произведение {idx}',
+                'year': 2000,
+                'genre': [genre['slug'] for genre in genres],
+                'category': categories[idx % 2]['slug'],
+            })
+        return titles
+
+    @pytest.mark.parametrize('title_count', (2, 12))
+    def test_01_title_list(self, client, admin_client,
+                           django_assert_max_num_queries, title_count):
+        self.create_many_titles(admin_client, title_count)
+        with django_assert_max_num_queries(self.TITLE_LIST_QUERIES):
+            response = client.get('/api/v1/titles/')
+        assert len(response.json()['results']) == min(title_count, 10)
+
+    def test_02_title_detail(self, client, admin_client,
+                             django_assert_max_num_queries):
+        titles = self.create_many_titles(admin_client, 3)
+        with django_assert_max_num_queries(self.TITLE_DETAIL_QUERIES):
+            client.get(f'/api/v1/titles/{titles[0]["id"]}/')
+
+    REVIEW_CREATE_QUERIES = 5
+    COMMENT_CREATE_QUERIES = 5
+
+    def test_03_review_and_comment_create(self, admin_client, user_client,
+                                          django_assert_max_num_queries):
+        titles = self.create_many_titles(admin_client, 2)
+        url = f'/api/v1/titles/{titles[0]["id"]}/reviews/'
+        with django_assert_max_num_queries(self.REVIEW_CREATE_QUERIES):
+            response = user_client.post(url, data={'text': 'a', 'score': 5})
+        assert response.status_code == 201
+        with django_assert_max_num_queries(self.COMMENT_CREATE_QUERIES):
+            response = user_client.post(
+                f'{url}{response.json()["id"]}/comments/', data={'text': 'b'}
+            )
+        assert response.status_code == 201
+
+    REVIEW_LIST_QUERIES = 3
+    COMMENT_LIST_QUERIES = 3
+
+    def create_many_reviews(self, admin_client, count):
+        from reviews.models import Comment, Review, User
+
+        titles = self.create_many_titles(admin_client, 2)
+        User.objects.bulk_create(
+            User(username=f'author{idx}', email=f'author{idx}@yamdb.fake')
+            for idx in range(count)
+        )
+        authors = User.objects.filter(username__startswith='author')
+        Review.objects.bulk_create(
+            Review(author=author, title_id=titles[0]['id'], text='t', score=5)
+            for author in authors
+        )
+        review = Review.objects.filter(title_id=titles[0]['id']).first()
+        Comment.objects.bulk_create(
+            Comment(author=author, review=review, text='t')
+            for author in authors
+        )
+        return titles[0]['id'], review.id
+
+    @pytest.mark.parametrize('page_size', (10, 100))
+    def test_04_review_and_comment_list(self, client, admin_client,
+                                        django_assert_max_num_queries,
+                                        monkeypatch, page_size):
+        from rest_framework.pagination import PageNumberPagination
+
+        monkeypatch.setattr(PageNumberPagination, 'page_size', page_size)
+        title_id, review_id = self.create_many_reviews(admin_client, 100)
+        url = f'/api/v1/titles/{title_id}/reviews/'
+
+        with django_assert_max_num_queries(self.REVIEW_LIST_QUERIES):
+            response = client.get(url)
+        assert len(response.json()['results']) == page_size, (
+            f'Проверьте, что список отзывов `{url}` выполняет постоянное '
+            'число запросов к БД.'
+        )
+        with django_assert_max_num_queries(self.REVIEW_LIST_QUERIES):
+            client.get(f'{url}?cursor=')
+
+        url = f'{url}{review_id}/comments/'
+        with django_assert_max_num_queries(self.COMMENT_LIST_QUERIES):
+            response = client.get(url)
+        assert len(response.json()['results']) == page_size, (
+            f'Проверьте, что список комментариев `{url}` выполняет '
+            'постоянное число запросов к БД.'
+        )
+
+    TITLE_ENDPOINT_QUERIES = {
+        '?cursor=': 2,
+        '?search={name}': 3,
+        '?genre={genre}': 4,
+        '?genre={genre},{other_genre}&genre_match=all': 4,
+        '?fields=id,name,genre': 3,
+        'top/': 3,
+        '{id}/rating-distribution/': 1,
+    }
+
+    @pytest.mark.parametrize('title_count', (2, 12))
+    def test_05_title_endpoints(self, client, admin_client, user_client,
+                                django_assert_max_num_queries, title_count):
+        from io import StringIO
+
+        from django.core.management import call_command
+
+        from reviews.models import Title
+
+        titles = self.create_many_titles(admin_client, title_count)
+        for title_id in Title.objects.values_list('id', flat=True):
+            user_client.post(
+                f'/api/v1/titles/{title_id}/reviews/',
+                data={'text': 'a', 'score': 5},
+            )
+        call_command('rank_titles', stdout=StringIO())
+        genres = titles[0]['genre']
+        params = {
+            'id': titles[0]['id'],
+            'name': titles[0]['name'],
+            'genre': genres[0],
+            'other_genre': genres[-1],
+        }
+        for path, budget in self.TITLE_ENDPOINT_QUERIES.items():
+            url = '/api/v1/titles/' + path.format(**params)
+            with django_assert_max_num_queries(budget):
+                response = client.get(url)
+            assert response.status_code == 200, url
+            data = response.json()
+            assert data.get('results', data), (
+                f'Проверьте, что `{url}` возвращает данные и выполняет не '
+                f'больше {budget} запросов к БД.'
+            )
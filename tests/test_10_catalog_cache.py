@@ -0,0 +1,162 @@
+import pytest
+from tests.utils import create_single_review, create_titles
+
+
+@pytest.mark.django_db(transaction=True)
+class Test10CatalogCache:
+
+    def test_01_anonymous_reads_are_cached(self, client, admin_client,
+                                           django_assert_num_queries):
+        titles, _, _ = create_titles(admin_client)
+        for url in ('/api/v1/titles/', '/api/v1/genres/',
+                    '/api/v1/categories/',
+                    f'/api/v1/titles/{titles[0]["id"]}/'):
+            expected = client.get(url).json()
+            with django_assert_num_queries(0):
+                response = client.get(url)
+            assert response.json() == expected, (
+                f'Проверьте, что повторный анонимный GET-запрос к `{url}` '
+                'отдаётся из кэша без запросов к БД.'
+            )
+
+    def test_02_query_params_are_normalized(self, client, admin_client,
+                                            django_assert_num_queries):
+        create_titles(admin_client)
+        client.get('/api/v1/titles/?year=1984&genre=horror')
+        with django_assert_num_queries(0):
+            client.get('/api/v1/titles/?genre=horror&year=1984')
+
+        assert 'count' in client.get('/api/v1/titles/').json()
+        response = client.get('/api/v1/titles/?cursor=')
+        assert 'count' not in response.json(), (
+            'Проверьте, что `?cursor=` не получает из кэша ответ '
+            'с постраничной пагинацией.'
+        )
+
+    def test_03_writes_invalidate_dependent_responses(
+            self, client, admin_client, user_client,
+            django_assert_num_queries):
+        titles, _, _ = create_titles(admin_client)
+        url = f'/api/v1/titles/{titles[0]["id"]}/'
+        client.get('/api/v1/categories/')
+        assert client.get(url).json()['rating'] is None
+
+        create_single_review(user_client, titles[0]['id'], 'text', 6)
+        assert client.get(url).json()['rating'] == 6, (
+            'Проверьте, что новый отзыв сбрасывает закэшированные '
+            'ответы эндпоинта `/api/v1/titles/`.'
+        )
+
+        admin_client.patch(url, data={'genre': ['drama']})
+        genres = [genre['slug'] for genre in client.get(url).json()['genre']]
+        assert genres == ['drama'], (
+            'Проверьте, что изменение жанров произведения сбрасывает '
+            'закэшированные ответы эндпоинта `/api/v1/titles/`.'
+        )
+
+        admin_client.post('/api/v1/genres/', data={
+            'name': 'Мюзикл', 'slug': 'musical'
+        })
+        with django_assert_num_queries(0):
+            client.get('/api/v1/categories/')
+
+    def test_04_conditional_get(self, client, admin_client, user_client,
+                                django_assert_num_queries):
+        titles, _, _ = create_titles(admin_client)
+        review = create_single_review(
+            user_client, titles[0]['id'], 'text', 6
+        ).json()
+        reviews_url = f'/api/v1/titles/{titles[0]["id"]}/reviews/'
+        comments_url = f'{reviews_url}{review["id"]}/comments/'
+        for url in ('/api/v1/titles/', f'/api/v1/titles/{titles[0]["id"]}/',
+                    '/api/v1/genres/', reviews_url,
+                    f'{reviews_url}{review["id"]}/', comments_url):
+            response = user_client.get(url)
+            assert response.has_header('ETag'), (
+                f'Проверьте, что ответ на GET-запрос к `{url}` содержит '
+                'заголовок `ETag`.'
+            )
+            assert response.has_header('Last-Modified')
+            with django_assert_num_queries(0):
+                response = user_client.get(
+                    url, HTTP_IF_NONE_MATCH=response['ETag']
+                )
+            assert response.status_code == 304, (
+                f'Проверьте, что GET-запрос к `{url}` с актуальным '
+                '`If-None-Match` получает ответ 304 без сериализации.'
+            )
+
+        response = user_client.get(f'/api/v1/titles/{titles[0]["id"]}/')
+        admin_client.patch(
+            f'/api/v1/titles/{titles[0]["id"]}/', data={'name': 'Новое'}
+        )
+        response = user_client.get(
+            f'/api/v1/titles/{titles[0]["id"]}/',
+            HTTP_IF_MODIFIED_SINCE=response['Last-Modified'],
+        )
+        assert response.status_code == 200, (
+            'Проверьте, что запись в ту же секунду, что и прошлый ответ, '
+            'не даёт ответа 304 по `If-Modified-Since`.'
+        )
+
+        etag = user_client.get('/api/v1/genres/')['ETag']
+        user_client.patch(f'{reviews_url}{review["id"]}/', data={'score': 1})
+        assert user_client.get('/api/v1/genres/')['ETag'] == etag, (
+            'Проверьте, что ETag списка жанров не зависит от отзывов.'
+        )
+        etag = user_client.get(reviews_url)['ETag']
+        user_client.post(comments_url, data={'text': 'comment'})
+        response = user_client.get(reviews_url, HTTP_IF_NONE_MATCH=etag)
+        assert response.status_code == 200, (
+            'Проверьте, что новый комментарий меняет ETag списка отзывов, '
+            'в котором показано количество комментариев.'
+        )
+
+    def test_05_versions_change_after_commit(self):
+        from django.db import transaction
+
+        from api.v1.cache import get_versions
+        from reviews.models import Genre
+
+        before = get_versions((Genre,))
+        with transaction.atomic():
+            Genre.objects.create(name='Мюзикл', slug='musical')
+            assert get_versions((Genre,)) == before, (
+                'Проверьте, что метка версии обновляется только после '
+                'фиксации транзакции.'
+            )
+        assert get_versions((Genre,)) != before
+
+    def test_06_deleted_review_comments_are_not_cached(self, admin_client,
+                                                       user_client):
+        titles, _, _ = create_titles(admin_client)
+        review = create_single_review(
+            user_client, titles[0]['id'], 'text', 6
+        ).json()
+        url = (
+            f'/api/v1/titles/{titles[0]["id"]}/reviews/{review["id"]}/'
+            'comments/'
+        )
+        etag = user_client.get(url)['ETag']
+        user_client.delete(
+            f'/api/v1/titles/{titles[0]["id"]}/reviews/{review["id"]}/'
+        )
+        response = user_client.get(url, HTTP_IF_NONE_MATCH=etag)
+        assert response.status_code == 404, (
+            'Проверьте, что ETag комментариев зависит от отзыва и '
+            'произведения.'
+        )
+
+    def test_07_wildcard_etag_needs_existing_resource(self, client,
+                                                      admin_client):
+        titles, _, _ = create_titles(admin_client)
+        for url in ('/api/v1/titles/999/', '/api/v1/titles/999/reviews/'):
+            response = client.get(url, HTTP_IF_NONE_MATCH='*')
+            assert response.status_code == 404, (
+                f'Проверьте, что `If-None-Match: *` не отвечает 304 на '
+                f'запрос к несуществующему ресурсу `{url}`.'
+            )
+        response = client.get(
+            f'/api/v1/titles/{titles[0]["id"]}/', HTTP_IF_NONE_MATCH='*'
+        )
+        assert response.status_code == 200